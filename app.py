@@ -34,5 +34,11 @@ st.markdown("""
         <p>Admin tools for filings, scrapers, and backend management.</p>
     </a>
 
+    <a href="pages/Stock_Screener" target="_self" class="nav-card">
+        <div class="icon">🔎</div>
+        <h3>Stock Screener</h3>
+        <p>Filter and rank every company by its fundamentals.</p>
+    </a>
+
 </div>
 """, unsafe_allow_html=True)
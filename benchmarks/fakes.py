@@ -0,0 +1,395 @@
+"""In-process stand-ins for Supabase, yfinance and the news/article endpoints.
+
+Nothing here touches the network, so the benchmarks measure our own code
+(plus SQLite/Parquet caches) and count the round trips it would make.
+"""
+import fnmatch
+import hashlib
+import itertools
+import re
+from collections import Counter
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from types import SimpleNamespace
+import pandas as pd
+
+FIXTURES = Path(__file__).parent / "fixtures"
+RSS_TEMPLATE = (FIXTURES / "google_news.xml").read_text()
+ARTICLE_TEMPLATE = (FIXTURES / "article.html").read_text()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_ts(value):
+    if value is None:
+        return None
+    if len(value) == 10:
+        value += "T00:00:00"
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _compare(a, b):
+    """Compare two column values, as timestamps when both look like dates."""
+    date_like = re.compile(r"\d{4}-\d{2}-\d{2}")
+    if isinstance(a, str) and isinstance(b, str) and date_like.match(a) and date_like.match(b):
+        return _parse_ts(a), _parse_ts(b)
+    return a, b
+
+
+class FakeQuery:
+    """Supports the PostgREST builder chain the app uses; execute() counts one round trip."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        self.orders = []
+        self.embed_orders = {}
+        self.embed_limits = {}
+        self.row_limit = None
+        self.row_range = None
+
+    # ---- actions ----
+    def select(self, columns="*", count=None):
+        self.columns = columns
+        return self
+
+    def insert(self, json, **_):
+        self.action, self.payload = "insert", json
+        return self
+
+    def upsert(self, json, on_conflict="", ignore_duplicates=False, **_):
+        self.action, self.payload = "upsert", json
+        self.on_conflict = on_conflict or "id"
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, **_):
+        self.action, self.payload = "update", json
+        return self
+
+    def delete(self, **_):
+        self.action = "delete"
+        return self
+
+    # ---- filters ----
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def ilike(self, column, pattern):
+        regex = fnmatch.translate(pattern.replace("%", "*").lower())
+        self.filters.append(lambda r: re.match(regex, str(r.get(column) or "").lower()) is not None)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def _cmp(self, column, value, op):
+        def check(row):
+            if row.get(column) is None:
+                return False
+            a, b = _compare(row[column], value)
+            return op(a, b)
+        self.filters.append(check)
+        return self
+
+    def lt(self, column, value):
+        return self._cmp(column, value, lambda a, b: a < b)
+
+    def lte(self, column, value):
+        return self._cmp(column, value, lambda a, b: a <= b)
+
+    def gt(self, column, value):
+        return self._cmp(column, value, lambda a, b: a > b)
+
+    def gte(self, column, value):
+        return self._cmp(column, value, lambda a, b: a >= b)
+
+    def order(self, column, desc=False, nullsfirst=None, foreign_table=None):
+        if foreign_table:
+            self.embed_orders[foreign_table] = (column, desc, nullsfirst)
+        else:
+            self.orders.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size, foreign_table=None):
+        if foreign_table:
+            self.embed_limits[foreign_table] = size
+        else:
+            self.row_limit = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self.row_range = (start, end)
+        return self
+
+    # ---- execution ----
+    def _matches(self, row):
+        return all(f(row) for f in self.filters)
+
+    def _sorted(self, rows, orders):
+        for column, desc, nullsfirst in reversed(orders):
+            values = sorted(
+                (r for r in rows if r.get(column) is not None),
+                key=lambda r: _compare(r[column], r[column])[0],
+                reverse=desc,
+            )
+            nulls = [r for r in rows if r.get(column) is None]
+            # Postgres puts NULLs first in descending order unless told otherwise
+            rows = nulls + values if (desc if nullsfirst is None else nullsfirst) else values + nulls
+        return rows
+
+    def _embed(self, row):
+        """Resolve embedded resources like 'valuation(*)' by company_id, else by ticker."""
+        result = {}
+        for name, columns in re.findall(r"(\w+)\(([^)]*)\)", self.columns):
+            children = [
+                c for c in self.db.tables.get(name, [])
+                if ("company_id" in c and c["company_id"] == row.get("id"))
+                or ("company_id" not in c and c.get("ticker") == row.get("ticker"))
+            ]
+            if name in self.embed_orders:
+                children = self._sorted(children, [self.embed_orders[name]])
+            if name in self.embed_limits:
+                children = children[:self.embed_limits[name]]
+            result[name] = [self._project(c, columns) for c in children]
+        return result
+
+    def _project(self, row, columns):
+        columns = re.sub(r"\w+\([^)]*\)", "", columns)
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        if not names or "*" in names:
+            return deepcopy(row)
+        return {n: deepcopy(row.get(n)) for n in names}
+
+    def execute(self):
+        self.db.calls[(self.table, self.action)] += 1
+        rows = self.db.tables.setdefault(self.table, [])
+
+        if self.action == "insert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            return SimpleNamespace(data=[deepcopy(self.db.add(self.table, r)) for r in payload], count=None)
+
+        if self.action == "upsert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = [k.strip() for k in self.on_conflict.split(",")]
+            index = {tuple(r.get(k) for k in keys): r for r in rows}
+            out = []
+            for record in payload:
+                existing = index.get(tuple(record.get(k) for k in keys))
+                if existing is None:
+                    new = self.db.add(self.table, record)
+                    index[tuple(record.get(k) for k in keys)] = new
+                    out.append(deepcopy(new))
+                elif not self.ignore_duplicates:
+                    existing.update(deepcopy(record))
+                    out.append(deepcopy(existing))
+            return SimpleNamespace(data=out, count=None)
+
+        matched = [r for r in rows if self._matches(r)]
+        if self.action == "update":
+            for r in matched:
+                r.update(deepcopy(self.payload))
+            return SimpleNamespace(data=deepcopy(matched), count=None)
+        if self.action == "delete":
+            self.db.tables[self.table] = [r for r in rows if not self._matches(r)]
+            return SimpleNamespace(data=deepcopy(matched), count=None)
+
+        matched = self._sorted(matched, self.orders)
+        if self.row_range:
+            matched = matched[self.row_range[0]:self.row_range[1] + 1]
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        data = [{**self._project(r, self.columns), **self._embed(r)} for r in matched]
+        return SimpleNamespace(data=data, count=len(data))
+
+
+class FakeRpc:
+    def __init__(self, db, name, params):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        self.db.calls[("rpc", self.name)] += 1
+        return SimpleNamespace(data=getattr(self.db, f"rpc_{self.name}")(**self.params))
+
+
+class FakeSupabase:
+    """A dict-of-lists database behind the supabase-py client interface."""
+
+    def __init__(self):
+        self.tables = {}
+        self.calls = Counter()
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        self.tables = {}
+        self.calls = Counter()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params or {})
+
+    def add(self, table, record):
+        row = {"id": next(self._ids), "created_at": _now(), **deepcopy(record)}
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    @property
+    def round_trips(self):
+        return sum(self.calls.values())
+
+    # ---- SQL functions from supabase/migrations ----
+    def rpc_claim_due_filings(self, p_worker, p_limit, p_lease_seconds, p_max_attempts=5):
+        now = datetime.now(timezone.utc)
+        claimed = []
+        for row in sorted(self.tables.get("filings", []), key=lambda r: r.get("next_earnings_date") or ""):
+            if len(claimed) >= p_limit:
+                break
+            due = _parse_ts(row.get("next_earnings_date"))
+            lease = _parse_ts(row.get("lease_expires_at"))
+            if due and due <= now and (lease is None or lease < now) and (row.get("attempts") or 0) < p_max_attempts:
+                row["lease_owner"] = p_worker
+                row["lease_expires_at"] = (now + timedelta(seconds=p_lease_seconds)).isoformat()
+                claimed.append(deepcopy(row))
+        return claimed
+
+    def rpc_claim_llm_jobs(self, p_worker, p_limit, p_lease_seconds, p_max_attempts=3):
+        now = datetime.now(timezone.utc)
+        claimed = []
+        for row in sorted(self.tables.get("llm_jobs", []), key=lambda r: r["created_at"]):
+            if len(claimed) >= p_limit:
+                break
+            lease = _parse_ts(row.get("lease_expires_at"))
+            lost = row["status"] == "running" and lease is not None and lease < now
+            if (row["status"] == "queued" or lost) and (row.get("attempts") or 0) < p_max_attempts:
+                row.update({
+                    "status": "running",
+                    "lease_owner": p_worker,
+                    "lease_expires_at": (now + timedelta(seconds=p_lease_seconds)).isoformat(),
+                    "attempts": (row.get("attempts") or 0) + 1,
+                })
+                claimed.append(deepcopy(row))
+        return claimed
+
+    def rpc_filing_queue_status(self, p_max_attempts=5):
+        now = datetime.now(timezone.utc)
+        filings = self.tables.get("filings", [])
+        leased = [r for r in filings if _parse_ts(r.get("lease_expires_at")) and _parse_ts(r["lease_expires_at"]) >= now]
+        runs = [r["last_run_at"] for r in self.tables.get("worker_runs", []) if r.get("last_run_at")]
+        return {
+            "queue_depth": sum(
+                1 for r in filings
+                if _parse_ts(r.get("next_earnings_date")) and _parse_ts(r["next_earnings_date"]) <= now
+                and r not in leased and (r.get("attempts") or 0) < p_max_attempts
+            ),
+            "failed": sum(1 for r in filings if (r.get("attempts") or 0) >= p_max_attempts),
+            "in_flight": len(leased),
+            "last_run_at": max(runs) if runs else None,
+        }
+
+    def rpc_screener_fingerprint(self):
+        return {
+            t: [max((r.get("updated_at") or "" for r in rows), default=None), len(rows)]
+            for t, rows in self.tables.items()
+        }
+
+
+def fake_info(ticker):
+    """Deterministic yfinance-like info payload for a ticker."""
+    seed = int(hashlib.sha1(ticker.encode()).hexdigest()[:8], 16)
+    r = lambda lo, hi, k: lo + (hi - lo) * (((seed >> k) & 0xFFFF) / 0xFFFF)
+    sectors = [("Technology", "Software"), ("Technology", "Semiconductors"), ("Energy", "Oil & Gas"),
+               ("Financial Services", "Banks"), ("Healthcare", "Biotechnology")]
+    sector, industry = sectors[seed % len(sectors)]
+    return {
+        "longName": f"{ticker.title()} Holdings Inc.",
+        "shortName": f"{ticker.title()} Holdings",
+        "sector": sector,
+        "industry": industry,
+        "country": "United States",
+        "currency": "USD",
+        "marketCap": int(r(1e9, 3e12, 0)),
+        "trailingPE": r(5, 60, 1),
+        "forwardPE": r(5, 50, 2),
+        "pegRatio": r(0.5, 3, 3),
+        "profitMargins": r(-0.1, 0.4, 4),
+        "returnOnAssets": r(-0.05, 0.25, 5),
+        "returnOnEquity": r(-0.2, 1.5, 6),
+        "revenueGrowth": r(-0.2, 0.5, 7),
+        "earningsGrowth": r(-0.5, 1.0, 8),
+        "quarterlyRevenueGrowth": r(-0.2, 0.5, 9),
+        "quarterlyEarningsGrowth": r(-0.5, 1.0, 10),
+        "totalDebt": int(r(0, 2e11, 11)),
+        "debtToEquity": r(0, 300, 12),
+        "currentRatio": r(0.5, 3, 13),
+        "quickRatio": r(0.3, 2.5, 14),
+        "freeCashflow": int(r(-1e9, 1e11, 15)),
+        "operatingCashflow": int(r(0, 1.2e11, 0)),
+        "grossProfits": int(r(1e8, 2e11, 1)),
+        "ebitda": int(r(1e8, 1.5e11, 2)),
+        "dividendRate": r(0, 5, 3),
+        "dividendYield": r(0, 0.06, 4),
+        "payoutRatio": r(0, 0.9, 5),
+    }
+
+
+class FakeTicker:
+    """Stands in for yfinance.Ticker."""
+
+    def __init__(self, ticker):
+        self.ticker = ticker.upper()
+
+    @property
+    def info(self):
+        return fake_info(self.ticker)
+
+    @property
+    def news(self):
+        now = datetime.now(timezone.utc).timestamp()
+        return [
+            {
+                "title": f"{self.ticker} headline {i}",
+                "link": f"https://finance.yahoo.com/news/{self.ticker.lower()}-{i}.html",
+                "publisher": "Yahoo Finance",
+                "providerPublishTime": int(now - i * 86400),
+            }
+            for i in range(8)
+        ]
+
+    @property
+    def recommendations_summary(self):
+        return pd.DataFrame(
+            {"strongBuy": [10, 9, 8, 8], "buy": [20, 21, 19, 18], "hold": [8, 8, 9, 10],
+             "sell": [1, 1, 2, 2], "strongSell": [0, 0, 1, 1]},
+            index=pd.Index(["0m", "-1m", "-2m", "-3m"], name="period"),
+        )
+
+
+def rss_for(query):
+    """Canned Google News RSS for a search query, dated over the last few days."""
+    company = query.split(" filing")[0].split(" financial report")[0].replace("+", " ")
+    slug = re.sub(r"\W+", "-", company.lower()).strip("-")
+    now = datetime.now(timezone.utc)
+    dates = {f"date{i}": format_datetime(now - timedelta(days=i)) for i in range(5)}
+    return RSS_TEMPLATE.format(query=query, company=company, slug=slug, **dates)
+
+
+def article_for(url):
+    """Canned article HTML for a URL."""
+    company = url.rstrip("/").split("/")[-2].replace("-", " ").title()
+    return ARTICLE_TEMPLATE.format(company=company)
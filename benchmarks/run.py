@@ -0,0 +1,285 @@
+"""Offline benchmarks for the hot paths, at several universe sizes.
+
+    python -m benchmarks.run                          # 1, 100 and 1000 tickers
+    python -m benchmarks.run --sizes 1 100 --only analyze_tickers push_news
+    python -m benchmarks.run --compare old.json new.json
+
+Supabase, yfinance, Google News and article downloads are replaced by the
+fakes in benchmarks/fakes.py, and every cache lives in a fresh temporary
+directory, so runs are repeatable and need no credentials or network.
+Results are written as JSON to benchmarks/results/ so runs can be diffed.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+SIZES = [1, 100, 1000]
+
+
+def install_fakes():
+    """Point every upstream dependency at the in-process fakes; returns the fake database."""
+    cache_dir = Path(tempfile.mkdtemp(prefix="bench-cache-"))
+    os.environ["INFO_CACHE_PATH"] = str(cache_dir / "yf_info.sqlite")
+    os.environ["PAGE_CACHE_PATH"] = str(cache_dir / "pages.sqlite")
+    os.environ["FINBERT_CACHE_PATH"] = str(cache_dir / "finbert.sqlite")
+    os.environ["HISTORY_PATH"] = str(cache_dir / "history")
+    os.environ["FEED_CACHE_PATH"] = str(cache_dir / "feeds.sqlite")
+    # The fakes answer instantly; time our code rather than the upstream rate limits
+    os.environ.setdefault("UPSTREAM_RATES", "yfinance=10000:10000,news.google.com=10000:10000,*=10000:10000")
+
+    from benchmarks import fakes
+
+    db = fakes.FakeSupabase()
+    sys.modules["supabase_client"] = SimpleNamespace(supabase=db)
+
+    import feedparser
+    import httpx
+    import trafilatura
+    import yfinance
+
+    yfinance.Ticker = fakes.FakeTicker
+
+    real_parse = feedparser.parse
+
+    def fake_parse(url_or_content, *args, **kwargs):
+        if isinstance(url_or_content, str) and url_or_content.startswith("http"):
+            query = url_or_content.split("q=", 1)[-1]
+            return real_parse(fakes.rss_for(query))
+        return real_parse(url_or_content)
+
+    feedparser.parse = fake_parse
+    trafilatura.fetch_url = lambda url, *args, **kwargs: fakes.article_for(url)
+
+    def handler(request):
+        query = request.url.params.get("q", "")
+        return httpx.Response(200, text=fakes.rss_for(query))
+
+    real_client = httpx.Client
+
+    class FakeClient(real_client):
+        def __init__(self, *args, **kwargs):
+            kwargs["transport"] = httpx.MockTransport(handler)
+            super().__init__(*args, **kwargs)
+
+    httpx.Client = FakeClient
+
+    # Extraction processes would not see these patches, so extraction runs
+    # in-process here; the benchmark still measures download + parsing.
+    from scripts import scraper
+
+    scraper.extract_isolated = lambda url, timeout=scraper.EXTRACT_TIMEOUT: scraper.extract_full_text(url)
+    return db
+
+
+def tickers(n):
+    return [f"T{i:04d}" for i in range(n)]
+
+
+METRICS = ["valuation", "profitability", "growth", "balance", "cashflow", "dividends", "recommendations"]
+
+
+# -------- Benchmarks: each takes (db, n) and returns the number of items processed --------
+def bench_analyze_ticker(db, n):
+    from scripts.analysis_module import analyze_ticker
+    for t in tickers(n):
+        analyze_ticker(t, METRICS)
+    return n
+
+
+def bench_analyze_tickers(db, n):
+    from scripts.analysis_module import analyze_tickers
+    result = analyze_tickers(tickers(n), METRICS)
+    assert not result["errors"], result["errors"]
+    return n
+
+
+def bench_push_news(db, n):
+    from scripts.euronews_module import push_news
+    for t in tickers(n):
+        push_news(t, f"{t.title()} Holdings")
+    return n
+
+
+def bench_push_filings(db, n):
+    from scripts.euro_filings_module import push_filings
+    for t in tickers(n):
+        push_filings(t, f"{t.title()} Holdings")
+    return n
+
+
+def bench_process_due_filings(db, n):
+    from scripts.filings import process_expired_or_due_filings
+    due = (datetime.now(timezone.utc) - timedelta(days=1)).date().isoformat()
+    for t in tickers(n):
+        db.add("filings", {
+            "ticker": t,
+            "company_name": f"{t.title()} Holdings",
+            "next_earnings_date": due,
+            "pending_filing": True,
+            "filing_source": "benchmark",
+            "attempts": 0,
+        })
+    processed = 0
+    while True:
+        done = process_expired_or_due_filings()
+        if not done:
+            break
+        processed += done
+    return processed
+
+
+def bench_extract_full_text(db, n):
+    from scripts.scraper import extract_full_text
+    urls = [f"https://news.example.com/{t.lower()}/q3-results" for t in tickers(n)]
+    for url in urls:
+        assert extract_full_text(url)
+    return n
+
+
+def bench_extract_full_text_warm(db, n):
+    from scripts.scraper import extract_full_text
+    urls = [f"https://news.example.com/warm-{t.lower()}/q3-results" for t in tickers(n)]
+    for url in urls:
+        extract_full_text(url)
+    db.calls.clear()
+    start = time.perf_counter()
+    for url in urls:
+        extract_full_text(url)
+    return n, time.perf_counter() - start
+
+
+def bench_frontend_viewer(db, n):
+    from streamlit.testing.v1 import AppTest
+    from scripts import analysis_module, company_index
+
+    analysis_module.analyze_tickers(tickers(n), METRICS)
+    company_index._index = None
+    db.calls.clear()
+
+    start = time.perf_counter()
+    app = AppTest.from_file(str(ROOT / "pages" / "Frontend_Viewer.py"), default_timeout=120)
+    app.run()
+    app.text_input[1].input(tickers(n)[-1])
+    app.run()
+    app.button(key="main_fetch").click().run()
+    assert not app.exception, app.exception
+    return 1, time.perf_counter() - start
+
+
+def bench_llm_jobs(db, n):
+    """Queue n analyses against the stand-in model server, then resubmit them unchanged."""
+    import threading
+    from scripts import analysis_module, llm_jobs, upstream
+    from scripts.finbert_stub_server import make_server
+
+    server = make_server(port=0, latency_ms=20, max_concurrency=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    model = f"http://127.0.0.1:{server.server_address[1]}/models/yiyanghkust/finbert-tone"
+    upstream.reset()
+    try:
+        analysis_module.analyze_tickers(tickers(n), METRICS)
+        db.calls.clear()
+
+        start = time.perf_counter()
+        jobs = [llm_jobs.submit(t, model) for t in tickers(n)]
+        while llm_jobs.process_queued_jobs(max_workers=4) != (0, 0):
+            pass
+        assert all(llm_jobs.get_job(job["id"])["status"] == "done" for job in jobs)
+        # Unchanged metric data is answered from llm_analysis without a job
+        assert all(llm_jobs.submit(t, model).get("cached") for t in tickers(n))
+        return n, time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+BENCHMARKS = {
+    "analyze_ticker": bench_analyze_ticker,
+    "analyze_tickers": bench_analyze_tickers,
+    "push_news": bench_push_news,
+    "push_filings": bench_push_filings,
+    "process_expired_or_due_filings": bench_process_due_filings,
+    "extract_full_text": bench_extract_full_text,
+    "extract_full_text_warm": bench_extract_full_text_warm,
+    "frontend_viewer": bench_frontend_viewer,
+    "llm_jobs": bench_llm_jobs,
+}
+
+
+def run(names, sizes):
+    db = install_fakes()
+    results = []
+    for name in names:
+        for n in sizes:
+            db.reset()
+            start = time.perf_counter()
+            outcome = BENCHMARKS[name](db, n)
+            seconds = time.perf_counter() - start
+            # Benchmarks with a setup phase report their own timed section
+            items, seconds = outcome if isinstance(outcome, tuple) else (outcome, seconds)
+            results.append({
+                "name": name,
+                "size": n,
+                "items": items,
+                "seconds": round(seconds, 4),
+                "per_item_ms": round(seconds * 1000 / max(items, 1), 3),
+                "round_trips": db.round_trips,
+                "calls": {f"{t}.{a}": c for (t, a), c in sorted(db.calls.items())},
+            })
+            print(f"{name:<32} n={n:<5} {seconds:>9.3f}s  {results[-1]['per_item_ms']:>9.3f} ms/item  "
+                  f"{db.round_trips:>6} round trips", flush=True)
+    return results
+
+
+def compare(old_path, new_path):
+    """Print per-benchmark time and round-trip changes between two result files."""
+    old = {(r["name"], r["size"]): r for r in json.loads(Path(old_path).read_text())["results"]}
+    new = {(r["name"], r["size"]): r for r in json.loads(Path(new_path).read_text())["results"]}
+    print(f"{'benchmark':<32} {'n':>5} {'old s':>9} {'new s':>9} {'change':>8} {'trips':>13}")
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        change = (n["seconds"] - o["seconds"]) / o["seconds"] * 100 if o["seconds"] else 0.0
+        print(f"{key[0]:<32} {key[1]:>5} {o['seconds']:>9.3f} {n['seconds']:>9.3f} {change:>+7.1f}% "
+              f"{o['round_trips']:>6}→{n['round_trips']:<6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline hot-path benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", type=Path, help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    results = run(args.only, args.sizes)
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+        },
+        "results": results,
+    }, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
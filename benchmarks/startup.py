@@ -0,0 +1,118 @@
+"""Cold-start import profile of each page, with a regression check.
+
+    python -m benchmarks.startup                  # profile every page
+    python -m benchmarks.startup --check          # fail on a forbidden import or a blown budget
+    python -m benchmarks.startup --write-budget   # record current timings as the new budget
+
+Each page's module-level imports are replayed in a fresh interpreter under
+`python -X importtime`, after `import streamlit` so only the page's own cost
+is counted. The budget file lists the heavy modules no page may import at
+startup and a per-page time budget in milliseconds.
+"""
+import argparse
+import ast
+import json
+import math
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_PATH = Path(__file__).parent / "startup_budget.json"
+ENTRIES = ["app.py", *sorted(str(p.relative_to(ROOT)) for p in (ROOT / "pages").glob("*.py"))]
+# Budgets are written with headroom so ordinary timing noise does not fail the check
+BUDGET_HEADROOM = 1.5
+MIN_BUDGET_MS = 100
+
+
+def page_imports(path):
+    """Import statements executed at module level by a page, as source lines."""
+    tree = ast.parse((ROOT / path).read_text(encoding="utf-8"))
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def profile_once(path):
+    """Run one cold import of a page; returns (total_ms, {top-level package: self ms})."""
+    code = "import streamlit\n" + "\n".join(page_imports(path))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    # Lines look like "import time:  self [us] | cumulative | imported package";
+    # everything up to streamlit's own top-level line is the baseline
+    lines = [l for l in proc.stderr.splitlines() if l.startswith("import time:") and "|" in l]
+    parsed = []
+    for line in lines[1:]:
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        parsed.append((int(self_us), int(cumulative_us), name.rstrip()))
+    start = next(i for i, (_, _, name) in enumerate(parsed) if name == " streamlit") + 1
+
+    total_us, packages = 0, {}
+    for self_us, cumulative_us, name in parsed[start:]:
+        if not name.startswith("  "):
+            total_us += cumulative_us
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return total_us / 1000, {k: v / 1000 for k, v in packages.items()}
+
+
+def profile(path, runs):
+    totals, packages = [], {}
+    for _ in range(runs):
+        total, by_package = profile_once(path)
+        totals.append(total)
+        for package, ms in by_package.items():
+            packages.setdefault(package, []).append(ms)
+    return {
+        "ms": round(statistics.median(totals), 1),
+        "packages": {k: round(statistics.median(v), 1) for k, v in packages.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page startup import profile")
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per page (the median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="packages listed per page")
+    parser.add_argument("--check", action="store_true", help="exit 1 on a forbidden import or a blown budget")
+    parser.add_argument("--write-budget", action="store_true", help="store current timings as the budget")
+    args = parser.parse_args()
+
+    budget = json.loads(BUDGET_PATH.read_text()) if BUDGET_PATH.exists() else {"forbidden": [], "pages": {}}
+    forbidden = set(budget["forbidden"])
+    failures = []
+
+    for entry in ENTRIES:
+        try:
+            result = profile(entry, args.runs)
+        except RuntimeError as e:
+            failures.append(f"{entry} failed to import: {e}")
+            continue
+        limit = budget["pages"].get(entry)
+        print(f"{entry:<32} {result['ms']:>8.1f} ms" + (f"  (budget {limit} ms)" if limit else ""))
+        ranked = sorted(result["packages"].items(), key=lambda kv: kv[1], reverse=True)
+        for package, ms in ranked[:args.top]:
+            print(f"    {package:<28} {ms:>8.1f} ms")
+
+        loaded = sorted(forbidden & result["packages"].keys())
+        if loaded:
+            failures.append(f"{entry} imports {', '.join(loaded)} at startup")
+        if limit and result["ms"] > limit:
+            failures.append(f"{entry} took {result['ms']} ms, over its {limit} ms budget")
+        if args.write_budget:
+            budget["pages"][entry] = max(MIN_BUDGET_MS, math.ceil(result["ms"] * BUDGET_HEADROOM / 10) * 10)
+
+    if args.write_budget:
+        BUDGET_PATH.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"Budget written to {BUDGET_PATH}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
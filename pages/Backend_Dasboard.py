@@ -1,11 +1,14 @@
 import streamlit as st
+import tempfile
 import pandas as pd
 from datetime import datetime
 from supabase_client import supabase
 from pathlib import Path
+from scripts.tracing import begin_rerun, end_rerun, latency_summary, slowest_reruns, export_jsonl
 
 # === PAGE CONFIG ===
 st.set_page_config(page_title="📊 Backend Dashboard", layout="wide")
+begin_rerun("Backend Dashboard")
 
 # === LOAD CSS ===
 def load_css():
@@ -30,12 +33,23 @@ st.markdown(f"""
 
 # === IMPORT MODULES ===
 from scripts.analysis_module import analyze_ticker
+from scripts.info_cache import cache_stats
+from scripts.feed_cache import cache_stats as feed_cache_stats
+from scripts.upstream import UpstreamError, stats as upstream_stats
+from scripts.company_index import get_company_index
 from scripts.euronews_module import push_news
 from scripts.filings import (
     save_or_update_filing,
-    process_expired_or_due_filings,
     get_next_filing,
 )
+from scripts.filing_worker import start_background_worker, get_queue_status
+from scripts.filing_calendar import (
+    EXPORT_COLUMNS,
+    read_calendar,
+    validate_calendar,
+    import_calendar,
+    export_filings_csv,
+)
 
 # === HEADER ===
 st.markdown("""
@@ -50,11 +64,9 @@ st.markdown("""
 # ==========================================================
 st.header("📈 Fundamental Analysis")
 
-companies_data = supabase.table("companies").select("ticker, company_name").execute()
-companies_df = pd.DataFrame(companies_data.data or [])
-
-tickers = sorted(companies_df["ticker"].tolist()) if not companies_df.empty else []
-company_names = sorted(companies_df["company_name"].tolist()) if not companies_df.empty else []
+company_index = get_company_index()
+tickers = company_index.tickers
+company_names = company_index.company_names
 
 st.sidebar.header("⚙️ Filters")
 ticker_choice = st.sidebar.selectbox("Select a Company Ticker", options=tickers)
@@ -73,6 +85,18 @@ selected_metrics = st.sidebar.multiselect(
     "Select Metrics to Display", options=metrics_options, default=metrics_options
 )
 
+info_stats = cache_stats()
+st.sidebar.caption(
+    f"yfinance cache: {info_stats['hits']} hits / {info_stats['misses']} misses, "
+    f"{info_stats['tickers']} tickers ({info_stats['bytes'] / 1024:.0f} KB)"
+)
+feed_stats = feed_cache_stats()
+st.sidebar.caption(
+    f"Feed cache: {feed_stats['memory_hits'] + feed_stats['disk_hits']} hits, "
+    f"{feed_stats['not_modified']} not modified, {feed_stats['fetched']} fetched, "
+    f"{feed_stats['coalesced']} coalesced"
+)
+
 @st.cache_data(ttl=8 * 60 * 60)
 def get_fundamentals(ticker, metrics):
     return analyze_ticker(ticker, metrics)
@@ -85,40 +109,56 @@ if st.sidebar.button("🔍 Fetch & Analyze"):
     if not ticker_choice or not company_choice:
         st.warning("Please select both ticker and company.")
     else:
-        with st.spinner("Fetching fundamentals..."):
-            fundamentals = get_fundamentals(ticker_choice, selected_metrics)
-        with st.spinner("Fetching news..."):
-            news_items = get_news(ticker_choice, company_choice)
-
-        st.success(f"✅ Data fetched for {ticker_choice} ({company_choice})")
-
-        tabs = st.tabs(selected_metrics + ["📰 News"])
-        for idx, metric in enumerate(selected_metrics):
-            with tabs[idx]:
-                data = fundamentals.get(metric)
-                if data:
-                    st.json(data)
-                else:
-                    st.info(f"No data for {metric}")
+        try:
+            with st.spinner("Fetching fundamentals..."):
+                fundamentals = get_fundamentals(ticker_choice, selected_metrics)
+            with st.spinner("Fetching news..."):
+                news_items = get_news(ticker_choice, company_choice)
+        except UpstreamError as e:
+            st.error(f"❌ Could not fetch data for {ticker_choice}: {e}")
+        else:
+            st.success(f"✅ Data fetched for {ticker_choice} ({company_choice})")
 
-        with tabs[len(selected_metrics)]:
-            st.subheader("📰 Latest News")
-            if news_items:
-                st.dataframe(pd.DataFrame(news_items))
-            else:
-                st.info("No news available")
+            tabs = st.tabs(selected_metrics + ["📰 News"])
+            for idx, metric in enumerate(selected_metrics):
+                with tabs[idx]:
+                    data = fundamentals.get(metric)
+                    if data:
+                        st.json(data)
+                    else:
+                        st.info(f"No data for {metric}")
+
+            with tabs[len(selected_metrics)]:
+                st.subheader("📰 Latest News")
+                if news_items:
+                    st.dataframe(pd.DataFrame(news_items))
+                else:
+                    st.info("No news available")
 
 # ==========================================================
 # FILINGS DASHBOARD
 # ==========================================================
 st.header("📅 Filings Dashboard")
 
-with st.spinner("Processing expired or due filings..."):
-    processed = process_expired_or_due_filings()
-if processed > 0:
-    st.success(f"✅ {processed} filing(s) moved to history.")
-else:
-    st.info("No filings were due today.")
+# Due filings are processed by a background worker; the page only reads its status
+@st.cache_resource
+def filing_worker():
+    return start_background_worker()
+
+filing_worker()
+
+queue_status = get_queue_status()
+col_queue, col_flight, col_run = st.columns(3)
+col_queue.metric("⏳ Due filings queued", queue_status.get("queue_depth", 0))
+col_flight.metric("⚙️ In flight", queue_status.get("in_flight", 0))
+col_run.metric("🕒 Last worker run", (queue_status.get("last_run_at") or "never")[:19])
+if queue_status.get("failed"):
+    st.warning(f"⚠️ {queue_status['failed']} filing(s) failed repeatedly and need attention.")
+with st.expander("Worker runs"):
+    if queue_status["workers"]:
+        st.dataframe(pd.DataFrame(queue_status["workers"]), hide_index=True, use_container_width=True)
+    else:
+        st.caption("No worker runs recorded yet.")
 
 st.subheader("⏭️ Next Expected Filing")
 next_filing = get_next_filing()
@@ -138,37 +178,40 @@ st.divider()
 
 # --- ACTIVE FILINGS ---
 st.subheader("🗓️ Active Filings")
+ACTIVE_FILINGS_SHOWN = 500
+# Streamlit holds a download in memory while serving it, so the export is capped
+EXPORT_MAX_ROWS = 100_000
 try:
     filings = (
         supabase.table("filings")
-        .select("*")
+        .select(", ".join(EXPORT_COLUMNS))
         .order("next_earnings_date", desc=False)
+        .limit(ACTIVE_FILINGS_SHOWN)
         .execute()
     )
     filings_data = filings.data or []
     if filings_data:
-        df_filings = pd.DataFrame(filings_data)
-        st.dataframe(
-            df_filings[
-                [
-                    "company_name",
-                    "ticker",
-                    "next_earnings_date",
-                    "pending_filing",
-                    "filing_source",
-                    "last_checked",
-                ]
-            ],
-            hide_index=True,
-            use_container_width=True,
-        )
-        csv = df_filings.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            label="📥 Download Active Filings CSV",
-            data=csv,
-            file_name="active_filings.csv",
-            mime="text/csv",
-        )
+        st.dataframe(pd.DataFrame(filings_data), hide_index=True, use_container_width=True)
+        if len(filings_data) == ACTIVE_FILINGS_SHOWN:
+            st.caption(
+                f"Showing the next {ACTIVE_FILINGS_SHOWN} filings; "
+                f"the export contains up to {EXPORT_MAX_ROWS:,} of them."
+            )
+
+        # The export is built page by page into a file on disk, only when asked for
+        if st.button("📦 Prepare Active Filings CSV"):
+            with st.spinner("Exporting filings..."), tempfile.TemporaryFile() as export:
+                exported = export_filings_csv(export, max_rows=EXPORT_MAX_ROWS)
+                export.seek(0)
+                export_data = export.read()
+            st.download_button(
+                label=f"📥 Download Active Filings CSV ({exported} rows)",
+                data=export_data,
+                file_name="active_filings.csv",
+                mime="text/csv",
+            )
+            if exported == EXPORT_MAX_ROWS:
+                st.warning(f"Export capped at {EXPORT_MAX_ROWS:,} filings (first by ticker).")
     else:
         st.warning("No active filings found.")
 except Exception as e:
@@ -191,7 +234,72 @@ with st.form("add_filing_form"):
 
     if submit:
         if ticker and company:
-            result = save_or_update_filing(ticker, company, date.isoformat(), source)
-            st.success(f"✅ Filing {result} successfully.")
+            save_or_update_filing(ticker, company, date.isoformat(), source)
+            st.success(f"✅ Filing for {ticker} saved, due {date.isoformat()}.")
         else:
             st.warning("Please fill both ticker and company name.")
+
+# --- BULK IMPORT ---
+st.subheader("📤 Import Earnings Calendar")
+st.caption("CSV or Parquet with ticker, company_name and next_earnings_date columns (filing_source optional).")
+calendar_file = st.file_uploader("Calendar file", type=["csv", "parquet"])
+if calendar_file is not None:
+    try:
+        calendar = read_calendar(calendar_file, calendar_file.name)
+        records, errors = validate_calendar(calendar, source="calendar_import")
+    except Exception as e:
+        records, errors = [], [{"row": None, "ticker": None, "error": f"could not read file: {e}"}]
+
+    st.write(f"✅ {len(records)} valid row(s), ⚠️ {len(errors)} issue(s)")
+    if errors:
+        st.dataframe(pd.DataFrame(errors), hide_index=True, use_container_width=True)
+    if records and st.button(f"💾 Import {len(records)} Filing(s)"):
+        try:
+            with st.spinner("Importing calendar..."):
+                imported = import_calendar(records)
+            st.success(f"✅ Imported {imported} filing(s).")
+        except Exception as e:
+            st.error(f"❌ Import failed: {e}")
+
+# ==========================================================
+# LATENCY
+# ==========================================================
+st.header("⏱️ Latency")
+st.caption("Timed calls to Supabase, yfinance, news feeds, article downloads and inference in this server process.")
+
+group_by = st.radio("Group by", ["operation", "table", "host", "ticker"], horizontal=True)
+summary = latency_summary(by_tag=None if group_by == "operation" else group_by)
+if summary:
+    st.dataframe(pd.DataFrame(summary), hide_index=True, use_container_width=True)
+
+    st.subheader("🐢 Slowest Recent Reruns")
+    reruns = pd.DataFrame(slowest_reruns(limit=10))
+    reruns["started"] = pd.to_datetime(reruns["started"], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S")
+    reruns["by_op"] = reruns["by_op"].map(lambda ops: ", ".join(f"{op} ×{n}" for op, n in sorted(ops.items())))
+    st.dataframe(reruns, hide_index=True, use_container_width=True)
+
+    st.download_button(
+        label="📥 Download Spans (JSON lines)",
+        data=export_jsonl(),
+        file_name="spans.jsonl",
+        mime="application/x-ndjson",
+    )
+else:
+    st.caption("No calls recorded yet.")
+
+st.subheader("🚦 Upstream Rate Limits")
+st.caption(
+    "Calls delayed by the limiter, throttled by the host (429), retried, failed after retries "
+    "and rejected while a host's circuit was open."
+)
+limits = upstream_stats()
+if limits:
+    st.dataframe(
+        pd.DataFrame.from_dict(limits, orient="index").rename_axis("host").reset_index(),
+        hide_index=True,
+        use_container_width=True,
+    )
+else:
+    st.caption("No upstream calls yet.")
+
+end_rerun()
@@ -1,26 +1,23 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timezone, timedelta
-from supabase_client import supabase
-from scripts.analysis_module import analyze_ticker
-from scripts.euronews_module import push_news
+from scripts import freshness
+from scripts.euronews_module import get_news_page
 from scripts.finbert_module import run_finbert_analysis  # ✅ NEW IMPORT
+from scripts.snapshot import load_company_snapshot
+from scripts.company_index import get_company_index
+from scripts.tracing import begin_rerun, end_rerun
 
 # --- Page Config ---
 st.set_page_config(page_title="🧭 Company Insights Viewer", layout="wide")
+begin_rerun("Company Insights Viewer")
 st.title("🧭 Company Insights Viewer")
 
 # --- Load CSS ---
 with open("assets/frontend_style.css") as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-# --- Load companies for autofill ---
-companies_resp = supabase.table("companies").select(
-    "id, ticker, company_name, sector, industry, currency, country"
-).execute()
-companies = companies_resp.data or []
-company_names = [c["company_name"] for c in companies if c.get("company_name")]
-tickers = [c["ticker"] for c in companies if c.get("ticker")]
+# --- Load companies for autofill (shared, incrementally refreshed index) ---
+company_index = get_company_index()
 
 # --- Input fields ---
 st.markdown('<div class="center-container">', unsafe_allow_html=True)
@@ -33,17 +30,19 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 # Autofill logic
 if company_input and not ticker_input:
-    match = next(
-        (c["ticker"] for c in companies if c["company_name"].lower() == company_input.lower()), ""
-    )
+    match = company_index.by_name(company_input)
     if match:
-        ticker_input = match
+        ticker_input = match["ticker"]
+    else:
+        suggestions = company_index.search(company_input, limit=5)
+        if suggestions:
+            st.caption("Did you mean: " + ", ".join(
+                f"{c['company_name']} ({c['ticker']})" for c in suggestions
+            ))
 elif ticker_input and not company_input:
-    match = next(
-        (c["company_name"] for c in companies if c["ticker"].lower() == ticker_input.lower()), ""
-    )
+    match = company_index.by_ticker(ticker_input)
     if match:
-        company_input = match
+        company_input = match["company_name"]
 
 # --- Sidebar configuration ---
 st.sidebar.header("📊 Configuration")
@@ -57,27 +56,28 @@ fetch_button_main = st.button("📡 Fetch Insights", key="main_fetch", use_conta
 fetch_triggered = fetch_button_sidebar or fetch_button_main
 
 # -------- Helper Functions --------
-def get_company_record(ticker):
-    if not ticker:
-        return None
-    res = supabase.table("companies").select("*").ilike("ticker", ticker).limit(1).execute()
-    return res.data[0] if res.data else None
-
-
-def get_table_rows(table, company_id=None, ticker=None):
-    """Fetch table rows based on either company_id or ticker"""
-    if table == "companies":
-        if ticker:
-            res = supabase.table("companies").select("*").ilike("ticker", ticker).execute()
-        else:
-            return []
-    elif company_id:
-        res = supabase.table(table).select("*").eq("company_id", company_id).execute()
-    elif ticker:
-        res = supabase.table(table).select("*").ilike("ticker", ticker).execute()
-    else:
-        return []
-    return res.data or []
+NEWS_PAGE_SIZE = 6
+
+
+def get_snapshot(ticker, company_name):
+    """Company, metrics, filings and first news page in one query, memoized per session and ticker.
+
+    Returns (snapshot, version): a finished refresh bumps the ticker's
+    freshness version, which reloads it.
+    """
+    snapshots = st.session_state.setdefault("snapshots", {})
+    loaded_version = freshness.version(ticker)
+    key = (ticker or company_name.lower(), loaded_version)
+    if key not in snapshots:
+        snapshots[key] = load_company_snapshot(
+            ticker=ticker, company_name=company_name, news_limit=NEWS_PAGE_SIZE + 1
+        )
+    return snapshots[key], loaded_version
+
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
 
 
 def display_dict_pretty(data_dict):
@@ -85,38 +85,71 @@ def display_dict_pretty(data_dict):
         st.markdown(f"<div class='metric-item'><b>{k}:</b> {v}</div>", unsafe_allow_html=True)
 
 
-def recent_record_exists(table, ticker):
-    try:
-        res = (
-            supabase.table(table)
-            .select("run_timestamp")
-            .ilike("ticker", ticker)
-            .order("run_timestamp", desc=True)
-            .limit(1)
-            .execute()
-        )
-        if not res.data:
-            return False
-        last_ts = datetime.fromisoformat(res.data[0]["run_timestamp"].replace("Z", "+00:00"))
-        return (datetime.now(timezone.utc) - last_ts) < timedelta(days=1)
-    except Exception:
-        return False
+@st.fragment(run_every=2)
+def refresh_watcher(ticker, seen_version):
+    """Rerun the page once a background refresh of ticker has landed."""
+    if freshness.version(ticker) != seen_version:
+        st.rerun()
+    pending = freshness.refreshing(ticker)
+    if pending:
+        st.caption(f"🔄 Refreshing {', '.join(pending)} in the background…")
 
 
 # -------- Main Display Logic --------
-if fetch_triggered and company_input:
+if fetch_triggered and company_input and not ticker_input.strip():
+    st.warning("No ticker found for this company; enter the ticker to fetch its data.")
+elif fetch_triggered and company_input:
     company_name = company_input.strip()
     ticker = ticker_input.strip().upper()
 
-    # Fetch or trigger analysis
-    if not recent_record_exists("fundamentals", ticker):
-        analyze_ticker(ticker, selected_metrics)
-    push_news(ticker, company_name)
+    # Stored data renders right away; only stale kinds are refreshed, in the
+    # background unless there is nothing stored for this company yet
+    kinds = freshness.kinds_for(selected_metrics) | {"news"}
+    known = company_index.by_ticker(ticker) is not None
+    state_version = freshness.version(ticker)
+    status = freshness.ensure_fresh(
+        ticker, company_name, kinds, selected_metrics,
+        blocking=() if known else freshness.FUNDAMENTAL_KINDS,
+    )
+    for kind, error in status["errors"].items():
+        st.warning(f"⚠️ Could not refresh {kind}: {error}")
+
+    # Keep the results on screen across reruns (news paging, Run Analysis)
+    st.session_state.viewer = {
+        "ticker": ticker,
+        "company_name": company_name,
+        "metrics": selected_metrics,
+        "state": status["state"],
+        "state_version": state_version,
+    }
+    st.session_state.news_page = 0
+
+viewer = st.session_state.get("viewer")
+if viewer:
+    ticker = viewer["ticker"]
+    company_name = viewer["company_name"]
+    selected_metrics = list(viewer["metrics"])
 
     st.markdown("<div class='complete-box'>✅ Complete</div>", unsafe_allow_html=True)
 
-    company = get_company_record(ticker)
-    company_id = company.get("id") if company else None
+    snapshot, snapshot_version = get_snapshot(ticker, company_name)
+    # Refresh times are reloaded only after a refresh has finished
+    if viewer.get("state_version") != freshness.version(ticker):
+        viewer["state"] = freshness.load_state(ticker)
+        viewer["state_version"] = freshness.version(ticker)
+    state = viewer.get("state") or {}
+    st.caption(" · ".join(
+        f"{kind.title()} updated {freshness.describe_age(freshness.age(state, kind))}"
+        for kind in sorted(freshness.kinds_for(selected_metrics) | {"news", "filings"})
+    ))
+    # Checked before the version: a refresh bumps the version before it leaves
+    # the in-flight set, so one that lands in between is still seen below
+    pending = freshness.refreshing(ticker)
+    if freshness.version(ticker) != snapshot_version:
+        # A refresh landed while the snapshot was loading
+        st.rerun()
+    if pending:
+        refresh_watcher(ticker, snapshot_version)
 
     st.markdown('<div class="fade-in-results">', unsafe_allow_html=True)
 
@@ -124,18 +157,8 @@ if fetch_triggered and company_input:
     if "companies" in selected_metrics:
         st.subheader("🏢 Company Overview")
 
-        companies_data = []
-        if ticker:
-            companies_data = (
-                supabase.table("companies").select("*").ilike("ticker", ticker).execute().data or []
-            )
-        elif company_name:
-            companies_data = (
-                supabase.table("companies").select("*").ilike("company_name", company_name).execute().data or []
-            )
-
-        if companies_data:
-            comp = companies_data[0]
+        if snapshot:
+            comp = snapshot.company
             st.markdown(
                 f"""
             <div class='company-card'>
@@ -159,7 +182,7 @@ if fetch_triggered and company_input:
         cols = st.columns(len(selected_metrics))
         for idx, metric in enumerate(selected_metrics):
             with cols[idx]:
-                rows = get_table_rows(metric, company_id, ticker)
+                rows = snapshot.rows(metric) if snapshot else []
                 if not rows:
                     st.caption(f"No data in '{metric}'.")
                     continue
@@ -173,9 +196,27 @@ if fetch_triggered and company_input:
                 display_dict_pretty(pretty)
                 st.markdown("</div>", unsafe_allow_html=True)
 
+    # ---- PEER RANKING ----
+    if snapshot and snapshot.ranks:
+        rank_lines = []
+        for metric in selected_metrics:
+            for field_name in snapshot.row(metric) or {}:
+                # Industry peers first, sector when the industry has no rank
+                rank = snapshot.rank(field_name, "industry") or snapshot.rank(field_name, "sector")
+                if rank and rank.get("percentile") is not None:
+                    rank_lines.append(
+                        f"**{field_name.replace('_', ' ').title()}:** "
+                        f"{ordinal(round(rank['percentile'] * 100))} percentile in "
+                        f"{rank['group_value']} ({rank['peer_count']} peers)"
+                    )
+        if rank_lines:
+            st.subheader("🏅 Peer Ranking")
+            for line in rank_lines:
+                st.markdown(f"<div class='metric-item'>{line}</div>", unsafe_allow_html=True)
+
     # ---- RECOMMENDATIONS ----
     if "recommendations" in selected_metrics:
-        rec_rows = get_table_rows("recommendations", company_id, ticker)
+        rec_rows = snapshot.rows("recommendations") if snapshot else []
         if rec_rows:
             st.subheader("💬 Analyst Recommendations")
             cols = st.columns(2)
@@ -192,7 +233,7 @@ if fetch_triggered and company_input:
 
     # ---- FILINGS ----
     st.subheader("📂 Upcoming Filings")
-    filings = supabase.table("filings").select("*").ilike("ticker", ticker).execute().data or []
+    filings = snapshot.filings if snapshot else []
     if filings:
         next_filing = filings[0]
         st.markdown(f"### 🗓️ Next Filing Date: {next_filing.get('next_earnings_date', 'N/A')}")
@@ -206,18 +247,34 @@ if fetch_triggered and company_input:
 
     # ---- NEWS ----
     st.subheader("📰 Latest News")
-    news_snapshot = supabase.table("news").select("*").ilike("ticker", ticker).limit(1).execute()
-    snapshot = news_snapshot.data[0] if news_snapshot.data else None
-    news_list = snapshot.get("news") if snapshot else []
+    page = st.session_state.get("news_page", 0)
+    if page == 0 and snapshot:
+        news_list, has_more = snapshot.news[:NEWS_PAGE_SIZE], len(snapshot.news) > NEWS_PAGE_SIZE
+    else:
+        news_list, has_more = get_news_page(ticker, page=page, page_size=NEWS_PAGE_SIZE)
     if news_list:
-        for item in news_list[:6]:
-            with st.expander(f"🗞️ {item.get('title','(no title)')}"):
-                st.markdown(f"**Summary:** {item.get('summary','N/A')}")
+        for item in news_list:
+            copies = item.get("cluster_size") or 1
+            label = f"🗞️ {item.get('title','(no title)')}" + (f" · {copies} sources" if copies > 1 else "")
+            with st.expander(label):
+                st.markdown(f"**Summary:** {item.get('summary') or 'N/A'}")
                 st.markdown(f"[🔗 Source Link]({item.get('link','#')})", unsafe_allow_html=True)
-                st.markdown(f"**Published Date:** {item.get('published','N/A')}")
+                st.markdown(f"**Published Date:** {item.get('published') or 'N/A'}")
     else:
         st.info("No recent news found.")
 
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("⬅️ Newer", disabled=page == 0):
+            st.session_state.news_page = page - 1
+            st.rerun()
+    with page_col:
+        st.caption(f"Page {page + 1}")
+    with next_col:
+        if st.button("Older ➡️", disabled=not has_more):
+            st.session_state.news_page = page + 1
+            st.rerun()
+
     # ✅ ---- FINBERT ANALYSIS SECTION ----
     st.markdown("---")
     st.subheader("🤖 Run FinBERT Fundamental Analysis")
@@ -232,7 +289,7 @@ if fetch_triggered and company_input:
         analysis_text = ""
 
         for metric in selected_metrics:
-            rows = get_table_rows(metric, company_id, ticker)
+            rows = snapshot.rows(metric) if snapshot else []
             if not rows:
                 continue
             row = rows[0]
@@ -257,3 +314,5 @@ if fetch_triggered and company_input:
 
 else:
     st.info("Enter a company name and click **Fetch Insights** to display information.")
+
+end_rerun()
@@ -1,62 +1,31 @@
 import streamlit as st
-import requests, json
-from datetime import datetime
 from supabase_client import supabase
-from scripts.analysis_module import analyze_ticker  # ✅ triggers the data refresh
+from scripts.llm_jobs import get_job, submit
+from scripts.llm_worker import start_background_worker
+from scripts.tracing import begin_rerun, end_rerun
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(page_title="🤖 LLM Analysis", layout="wide")
+begin_rerun("LLM Analysis")
 st.title("🤖 AI Fundamental Analysis (FinBERT-powered)")
 
-# ---------------- HELPER: FETCH DATA FROM SUPABASE ----------------
-def fetch_metric_data(ticker):
-    """Collect all related metric tables for the given ticker."""
-    tables = [
-        "valuation", "profitability", "growth",
-        "balance", "cashflow", "dividends", "recommendations"
-    ]
-    collected_data = {}
-    for table in tables:
-        res = supabase.table(table).select("*").ilike("ticker", ticker).execute()
-        if res.data:
-            collected_data[table] = res.data[0]
-    return collected_data
-
-
-# ---------------- HELPER: CALL HUGGINGFACE MODEL ----------------
-def run_finbert_analysis(ticker, collected_data):
-    hf_token = st.secrets["HUGGINGFACE_API_TOKEN"]
-    headers = {"Authorization": f"Bearer {hf_token}"}
-    model_url = "https://api-inference.huggingface.co/models/yiyanghkust/finbert-tone"
-
-    prompt = f"""
-    You are an expert financial analyst.
-    Perform an in-depth *fundamental analysis* for company ticker {ticker}.
-    Use only the data provided below, which includes key metrics across categories.
-
-    DATA SOURCE (metrics selected):
-    {json.dumps(collected_data, indent=2)}
-
-    Your response must:
-    - Reference the metrics that guided your reasoning
-    - Highlight strengths, weaknesses, and growth potential
-    - Conclude with a **suggested confidence score (0–100%)**
-    - Include the disclaimer: "This is not financial advice."
-    """
-
-    with st.spinner("Running FinBERT analysis... please wait..."):
-        response = requests.post(model_url, headers=headers, json={"inputs": prompt}, timeout=180)
-
-    if response.status_code == 200:
-        try:
-            result = response.json()
-            if isinstance(result, list):
-                return result[0].get("generated_text", "No analysis returned.")
-            return str(result)
-        except Exception:
-            return str(result)
-    else:
-        return f"❌ Error: {response.text}"
+# ---------------- BACKGROUND WORKER ----------------
+# Analyses run as queued jobs; the page submits them and polls their status
+@st.cache_resource
+def llm_worker():
+    return start_background_worker()
+
+llm_worker()
+
+
+@st.fragment(run_every=2)
+def job_watcher(job_id):
+    """Rerun the page once the job has finished."""
+    job = get_job(job_id)
+    if job and job["status"] not in ("queued", "running"):
+        st.session_state.llm_job = job
+        st.rerun()
+    st.caption(f"🔄 Analysis {job['status'] if job else 'queued'}… you can keep using the app.")
 
 
 # ---------------- SECTION: HISTORY ----------------
@@ -96,30 +65,29 @@ if run_button:
     if not ticker:
         st.error("Please enter a valid ticker.")
     else:
-        with st.spinner("🔄 Refreshing fundamental data..."):
-            analyze_ticker(ticker, [
-                "valuation", "profitability", "growth", "balance",
-                "cashflow", "dividends", "recommendations"
-            ])
-
-        metric_data = fetch_metric_data(ticker)
-        if not metric_data:
-            st.warning(f"No metrics found for ticker '{ticker}' in Supabase.")
-        else:
-            result = run_finbert_analysis(ticker, metric_data)
-
-            st.subheader("📊 AI Fundamental Analysis Result")
-            st.markdown(result)
-            st.caption("_Note: This analysis references the selected metrics and is not financial advice._")
-
-            # Save to database
-            entry = {
-                "ticker": ticker,
-                "analysis_result": result,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            supabase.table("llm_analysis").insert(entry).execute()
-
-            # Add new result to session history dynamically
-            st.session_state.analysis_history.insert(0, entry)
+        st.session_state.llm_job = submit(ticker)
+
+job = st.session_state.get("llm_job")
+if job:
+    if job["status"] in ("queued", "running"):
+        job_watcher(job["id"])
+    elif job["status"] == "failed":
+        st.error(f"❌ Analysis of {job['ticker']} failed: {job.get('error')}")
+    else:
+        st.subheader("📊 AI Fundamental Analysis Result")
+        st.markdown(job["result"])
+        st.caption("_Note: This analysis references the selected metrics and is not financial advice._")
+
+        if job.get("cached"):
+            st.caption(f"♻️ Metric data unchanged since the analysis of {job['created_at'][:19]}; reused it.")
+        elif st.session_state.get("llm_job_shown") != job["id"]:
+            # Add the new result to session history once
+            st.session_state.llm_job_shown = job["id"]
+            st.session_state.analysis_history.insert(0, {
+                "ticker": job["ticker"],
+                "analysis_result": job["result"],
+                "created_at": job["finished_at"],
+            })
             st.success("✅ Analysis saved and added to history.")
+
+end_rerun()
@@ -0,0 +1,66 @@
+import streamlit as st
+from scripts.screener import get_frame, screen, rank, numeric_columns
+from scripts.tracing import begin_rerun, end_rerun
+
+# --- Page Config ---
+st.set_page_config(page_title="🔎 Stock Screener", layout="wide")
+begin_rerun("Stock Screener")
+st.title("🔎 Stock Screener")
+
+# --- Load CSS ---
+with open("assets/frontend_style.css") as f:
+    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+# --- Load the cross-company frame (cached, reloaded only when tables change) ---
+with st.spinner("Loading fundamentals..."):
+    frame = get_frame()
+metric_columns = numeric_columns(frame)
+st.caption(f"{len(frame)} companies · {len(metric_columns)} metrics")
+
+# --- Sidebar configuration ---
+st.sidebar.header("🔎 Screen")
+expression = st.sidebar.text_area(
+    "Filter expression",
+    "trailing_pe < 15 & return_on_equity > 0.2 & debt_to_equity < 50",
+    help="Combine column comparisons with & (and), | (or) and ~ (not). "
+         "Text columns work too, e.g. sector == 'Technology'.",
+)
+sort_by = st.sidebar.selectbox("Sort by", ["(none)"] + metric_columns)
+ascending = st.sidebar.checkbox("Ascending", value=True)
+limit = st.sidebar.number_input("Max rows", min_value=10, max_value=5000, value=200, step=10)
+
+st.sidebar.header("🏅 Rank")
+rank_up = st.sidebar.multiselect("Higher is better", metric_columns, default=[])
+rank_down = st.sidebar.multiselect("Lower is better", metric_columns, default=[])
+
+# -------- Results --------
+try:
+    result = screen(
+        frame,
+        expression,
+        sort_by=None if sort_by == "(none)" else sort_by,
+        ascending=ascending,
+    )
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+
+if rank_up or rank_down:
+    weights = {c: 1 for c in rank_up}
+    weights.update({c: -1 for c in rank_down})
+    result = rank(result, weights)
+
+result = result.head(int(limit))
+st.subheader(f"📋 {len(result)} match(es)")
+if result.empty:
+    st.info("No companies match this screen.")
+else:
+    st.dataframe(result, use_container_width=True)
+    st.download_button(
+        label="📥 Download Results CSV",
+        data=result.to_csv().encode("utf-8"),
+        file_name="screener_results.csv",
+        mime="text/csv",
+    )
+
+end_rerun()
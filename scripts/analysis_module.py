@@ -1,27 +1,60 @@
-import yfinance as yf
-from datetime import datetime, timezone
-from supabase_client import supabase
+from concurrent.futures import ThreadPoolExecutor
+from scripts.db_writer import BatchWriter, upsert_records
+from scripts.info_cache import get_info, groups_for
+from scripts.lazy import lazy_import
+from scripts.tracing import bind, span
+from scripts.upstream import YFINANCE_HOST, call
+
+# Loaded on the first fetch rather than when a page imports this module
+yf = lazy_import("yfinance")
+
+METRIC_TABLES = [
+    "valuation",
+    "profitability",
+    "growth",
+    "balance",
+    "cashflow",
+    "dividends",
+]
+
+# Batch size for writes and default size of the yfinance worker pool
+BATCH_SIZE = 200
+MAX_WORKERS = 8
+
 
 def upsert_record(table, unique_field, match_value, record):
     """Upsert record into Supabase with created_at/updated_at"""
-    now = datetime.now(timezone.utc).isoformat()
-    record["updated_at"] = now
-    res = supabase.table(table).update(record).eq(unique_field, match_value).execute()
-    if res.data:
-        return res.data[0].get("id")
-    record["created_at"] = now
-    res = supabase.table(table).insert(record).execute()
-    return res.data[0].get("id") if res.data else None
+    record[unique_field] = match_value
+    return upsert_records(table, unique_field, [record]).get(match_value)
 
-def analyze_ticker(ticker: str, metrics: list):
-    """Analyze a ticker and push selected metrics to Supabase"""
-    ticker = ticker.upper()
-    stock = yf.Ticker(ticker)
-    info = stock.info or {}
+
+def _has_info(info):
+    return bool(info) and any(info.get(k) for k in ("longName", "shortName", "quoteType"))
+
+
+def fetch_ticker_data(ticker, metrics):
+    """Fetch yfinance info (through the disk cache) and recommendations if requested"""
+    def download(t):
+        # An empty info is an unknown or throttled ticker; raising keeps it out of the tables
+        with span("yfinance.info", ticker=t):
+            return call(YFINANCE_HOST, lambda: yf.Ticker(t).info, validate=_has_info)
+
+    info = get_info(ticker, groups_for(metrics), download)
+    recs = None
+    if "recommendations" in metrics:
+        try:
+            with span("yfinance.recommendations", ticker=ticker):
+                recs = call(YFINANCE_HOST, lambda: yf.Ticker(ticker).recommendations_summary)
+        except Exception:
+            recs = None
+    return info, recs
+
+
+def build_payloads(ticker, info, recs, metrics):
+    """Build the companies row and the selected metric rows for a ticker"""
     company_name = info.get("longName") or info.get("shortName") or ticker
 
-    # Companies table
-    company_payload = {
+    company = {
         "company_name": company_name,
         "ticker": ticker,
         "sector": info.get("sector"),
@@ -29,92 +62,66 @@ def analyze_ticker(ticker: str, metrics: list):
         "country": info.get("country"),
         "currency": info.get("currency"),
     }
-    company_id = upsert_record("companies", "ticker", ticker, company_payload)
-
-    results = {"company_id": company_id, "company_name": company_name}
 
-    # Optional metrics
+    rows = {}
     if "valuation" in metrics:
-        val = {
-            "company_id": company_id,
+        rows["valuation"] = {
             "market_cap": info.get("marketCap"),
             "trailing_pe": info.get("trailingPE"),
             "forward_pe": info.get("forwardPE"),
             "peg_ratio": info.get("pegRatio"),
             "uniquekey": f"{ticker}_valuation",
         }
-        upsert_record("valuation", "uniquekey", val["uniquekey"], val)
-        results["valuation"] = val
 
     if "profitability" in metrics:
-        prof = {
-            "company_id": company_id,
+        rows["profitability"] = {
             "profit_margins": info.get("profitMargins"),
             "return_on_assets": info.get("returnOnAssets"),
             "return_on_equity": info.get("returnOnEquity"),
             "uniquekey": f"{ticker}_profitability",
         }
-        upsert_record("profitability", "uniquekey", prof["uniquekey"], prof)
-        results["profitability"] = prof
 
     if "growth" in metrics:
-        growth = {
-            "company_id": company_id,
+        rows["growth"] = {
             "revenue_growth": info.get("revenueGrowth"),
             "earnings_growth": info.get("earningsGrowth"),
             "quarterly_revenue_growth": info.get("quarterlyRevenueGrowth"),
             "quarterly_earnings_growth": info.get("quarterlyEarningsGrowth"),
             "uniquekey": f"{ticker}_growth",
         }
-        upsert_record("growth", "uniquekey", growth["uniquekey"], growth)
-        results["growth"] = growth
 
     if "balance" in metrics:
-        balance = {
-            "company_id": company_id,
+        rows["balance"] = {
             "total_debt": info.get("totalDebt"),
             "debt_to_equity": info.get("debtToEquity"),
             "current_ratio": info.get("currentRatio"),
             "quick_ratio": info.get("quickRatio"),
             "uniquekey": f"{ticker}_balance",
         }
-        upsert_record("balance", "uniquekey", balance["uniquekey"], balance)
-        results["balance"] = balance
 
     if "cashflow" in metrics:
-        cashflow = {
-            "company_id": company_id,
+        rows["cashflow"] = {
             "free_cash_flow": info.get("freeCashflow"),
             "operating_cash_flow": info.get("operatingCashflow"),
             "gross_profits": info.get("grossProfits"),
             "ebitda": info.get("ebitda"),
             "uniquekey": f"{ticker}_cashflow",
         }
-        upsert_record("cashflow", "uniquekey", cashflow["uniquekey"], cashflow)
-        results["cashflow"] = cashflow
 
     if "dividends" in metrics:
-        dividends = {
-            "company_id": company_id,
+        rows["dividends"] = {
             "dividend_rate": info.get("dividendRate"),
             "dividend_yield": info.get("dividendYield"),
             "payout_ratio": info.get("payoutRatio"),
             "uniquekey": f"{ticker}_dividends",
         }
-        upsert_record("dividends", "uniquekey", dividends["uniquekey"], dividends)
-        results["dividends"] = dividends
 
     # Recommendations
     if "recommendations" in metrics:
-        try:
-            recs = stock.recommendations_summary
-        except Exception:
-            recs = None
         rec_list = []
         if recs is not None and not recs.empty:
             for period, row in recs.iterrows():
-                rec_record = {
-                    "company_id": company_id,
+                rec_list.append({
                     "period": str(period),
                     "strong_buy": row.get("strongBuy"),
                     "buy": row.get("buy"),
@@ -122,9 +129,105 @@ def analyze_ticker(ticker: str, metrics: list):
                     "sell": row.get("sell"),
                     "strong_sell": row.get("strongSell"),
                     "uniquekey": f"{ticker}_{period}",
-                }
-                upsert_record("recommendations", "uniquekey", rec_record["uniquekey"], rec_record)
-                rec_list.append(rec_record)
-        results["recommendations"] = rec_list
+                })
+        rows["recommendations"] = rec_list
 
+    return company, rows
+
+
+def _write_batch(built):
+    """Write a batch of built payloads with one upsert per table"""
+    company_ids = upsert_records(
+        "companies", "ticker", [company for company, _ in built.values()]
+    )
+
+    results = {}
+    writer = BatchWriter()
+    for ticker, (company, rows) in built.items():
+        company_id = company_ids.get(ticker)
+        result = {"company_id": company_id, "company_name": company["company_name"]}
+        for table, payload in rows.items():
+            for record in payload if table == "recommendations" else [payload]:
+                record["company_id"] = company_id
+                writer.add(table, "uniquekey", record)
+            result[table] = payload
+        results[ticker] = result
+
+    writer.flush()
+    try:
+        with span("history.append", tickers=len(results)):
+            # pandas/pyarrow are only imported once there is something to record
+            from scripts.history_store import append_snapshot
+
+            append_snapshot(results)
+    except Exception:
+        # History is best effort: the failure is recorded on the span and the
+        # Supabase rows are already written
+        pass
     return results
+
+
+def _refresh_ranks(results, metrics, background=False):
+    """Recompute peer ranks for the sectors/industries of the refreshed companies
+
+    In the background, single-ticker refreshes are batched and kept off the
+    caller's path; bulk runs recompute once, synchronously.
+    """
+    if not any(m in METRIC_TABLES for m in metrics):
+        return
+    from scripts.peer_ranks import refresh_peer_groups, schedule_refresh
+    company_ids = [r["company_id"] for r in results.values()]
+    if background:
+        schedule_refresh(company_ids)
+        return
+    try:
+        refresh_peer_groups(company_ids)
+    except Exception:
+        # Ranks are derived data; the next refresh of the group recomputes them
+        pass
+
+
+def analyze_tickers(tickers, metrics, max_workers=MAX_WORKERS, batch_size=BATCH_SIZE):
+    """Analyze many tickers and push selected metrics to Supabase in batches.
+
+    Returns {"results": {ticker: results}, "errors": {ticker: message}}.
+    A failing ticker (or batch write) is reported and does not stop the run.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    results, errors = {}, {}
+
+    def fetch(ticker):
+        info, recs = fetch_ticker_data(ticker, metrics)
+        return build_payloads(ticker, info, recs, metrics)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for start in range(0, len(tickers), batch_size):
+            batch = tickers[start:start + batch_size]
+            futures = {ticker: pool.submit(bind(fetch), ticker) for ticker in batch}
+
+            built = {}
+            for ticker, future in futures.items():
+                try:
+                    built[ticker] = future.result()
+                except Exception as e:
+                    errors[ticker] = str(e)
+
+            if not built:
+                continue
+            try:
+                results.update(_write_batch(built))
+            except Exception as e:
+                for ticker in built:
+                    errors[ticker] = f"write failed: {e}"
+
+    _refresh_ranks(results, metrics)
+    return {"results": results, "errors": errors}
+
+
+def analyze_ticker(ticker: str, metrics: list):
+    """Analyze a ticker and push selected metrics to Supabase"""
+    ticker = ticker.upper()
+    info, recs = fetch_ticker_data(ticker, metrics)
+    results = _write_batch({ticker: build_payloads(ticker, info, recs, metrics)})
+    _refresh_ranks(results, metrics, background=True)
+    return results[ticker]
@@ -0,0 +1,196 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from supabase_client import supabase
+
+COLUMNS = "id, ticker, company_name, sector, industry, currency, country, updated_at"
+# Seconds between incremental refreshes, and between full reloads (to drop deleted rows)
+REFRESH_TTL = 5 * 60
+FULL_RELOAD_TTL = 24 * 60 * 60
+PAGE_SIZE = 1000
+# updated_at is stamped by the database at transaction start, so a row can
+# commit after a later-stamped one; incremental refreshes look back this far
+OVERLAP_SECONDS = 60
+
+
+def normalize(value):
+    """Lowercase and collapse punctuation/whitespace so 'Apple, Inc.' == 'apple inc'."""
+    return re.sub(r"[^a-z0-9]+", " ", (value or "").lower()).strip()
+
+
+def _deletes(key):
+    """Every string one deletion away from key, plus key itself."""
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def _distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class CompanyIndex:
+    """In-memory index of the companies table for exact, prefix and typo-tolerant lookups."""
+
+    def __init__(self):
+        self.companies = {}
+        self.last_updated = None
+        self.refreshed_at = 0.0
+        self.reloaded_at = 0.0
+        self._lock = threading.Lock()
+        self._build()
+
+    def _fetch(self, since=None):
+        rows, start = [], 0
+        while True:
+            query = supabase.table("companies").select(COLUMNS)
+            if since:
+                query = query.gte("updated_at", since)
+            page = query.order("id").range(start, start + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    def _since(self):
+        """Lower bound for an incremental fetch: the newest updated_at seen, less the overlap."""
+        if not self.last_updated:
+            return None
+        last = datetime.fromisoformat(self.last_updated.replace("Z", "+00:00"))
+        return (last - timedelta(seconds=OVERLAP_SECONDS)).isoformat()
+
+    def refresh(self, full=False):
+        """Pull rows changed since the last refresh (or everything) and rebuild the lookups."""
+        with self._lock:
+            now = time.time()
+            full = full or not self.companies or now - self.reloaded_at > FULL_RELOAD_TTL
+            rows = self._fetch(None if full else self._since())
+            if full:
+                self.companies = {}
+                self.reloaded_at = now
+            # The overlap fetches rows already held again; only real changes rebuild
+            changed = False
+            for row in rows:
+                if self.companies.get(row["id"]) != row:
+                    self.companies[row["id"]] = row
+                    changed = True
+                if row.get("updated_at") and (not self.last_updated or row["updated_at"] > self.last_updated):
+                    self.last_updated = row["updated_at"]
+            if changed or full:
+                self._build()
+            self.refreshed_at = now
+
+    def refresh_if_stale(self, ttl=REFRESH_TTL):
+        if time.time() - self.refreshed_at > ttl:
+            self.refresh()
+        return self
+
+    def _build(self):
+        # Built into locals and swapped in at the end so readers never see a partial index
+        by_ticker, by_name, entries, neighbours = {}, {}, [], {}
+        for company_id, row in self.companies.items():
+            ticker = normalize(row.get("ticker"))
+            name = normalize(row.get("company_name"))
+            if ticker:
+                by_ticker.setdefault(ticker, company_id)
+            if name:
+                by_name.setdefault(name, company_id)
+            # Name words are indexed too, so "tesla" finds "Tesla, Inc."
+            words = [w for w in name.split() if len(w) >= 3]
+            for key in {ticker, name, *words} - {""}:
+                entries.append((key, company_id))
+                for neighbour in _deletes(key):
+                    neighbours.setdefault(neighbour, set()).add(company_id)
+        entries.sort()
+        self._by_ticker, self._by_name, self._neighbours = by_ticker, by_name, neighbours
+        self._sorted, self._keys = entries, [key for key, _ in entries]
+
+    def by_ticker(self, ticker):
+        company_id = self._by_ticker.get(normalize(ticker))
+        return self.companies.get(company_id)
+
+    def by_name(self, name):
+        company_id = self._by_name.get(normalize(name))
+        return self.companies.get(company_id)
+
+    def prefix(self, query, limit=10):
+        """Companies whose ticker or name starts with query, in key order."""
+        key = normalize(query)
+        if not key:
+            return []
+        found = {}
+        for i in range(bisect_left(self._keys, key), len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            found.setdefault(self._sorted[i][1], None)
+            if len(found) >= limit:
+                break
+        return [self.companies[company_id] for company_id in found]
+
+    def fuzzy(self, query, limit=10, max_distance=2):
+        """Companies whose ticker or name is within max_distance edits of query.
+
+        Candidates come from single-deletion neighbourhoods, which catch every
+        match one edit away and most matches two edits away.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        candidates = set()
+        for neighbour in _deletes(key):
+            candidates |= self._neighbours.get(neighbour, set())
+
+        scored = []
+        for company_id in candidates:
+            row = self.companies[company_id]
+            name = normalize(row.get("company_name"))
+            distance = min(
+                _distance(key, target, max_distance)
+                for target in [normalize(row.get("ticker")), name, *name.split()]
+            )
+            if distance <= max_distance:
+                scored.append((distance, name, company_id))
+        scored.sort()
+        return [self.companies[company_id] for _, _, company_id in scored[:limit]]
+
+    def search(self, query, limit=10):
+        """Exact matches first, then prefix matches, then typo-tolerant matches."""
+        results = {}
+        for row in (self.by_ticker(query), self.by_name(query)):
+            if row:
+                results[row["id"]] = row
+        for row in self.prefix(query, limit) + self.fuzzy(query, limit):
+            results.setdefault(row["id"], row)
+        return list(results.values())[:limit]
+
+    @property
+    def tickers(self):
+        return sorted(r["ticker"] for r in self.companies.values() if r.get("ticker"))
+
+    @property
+    def company_names(self):
+        return sorted(r["company_name"] for r in self.companies.values() if r.get("company_name"))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_company_index(ttl=REFRESH_TTL):
+    """Process-wide company index, refreshed incrementally once it is older than ttl."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CompanyIndex()
+    return _index.refresh_if_stale(ttl)
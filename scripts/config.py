@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import tomllib
+
+# Settings file for running without a Streamlit server (cron, worker boxes). It
+# uses the same keys as .streamlit/secrets.toml, so that file can be pointed at.
+CONFIG_PATH = os.environ.get("APP_CONFIG")
+
+_values = None
+_lock = threading.Lock()
+
+
+def load(path):
+    """Read settings from a TOML file, replacing any loaded before."""
+    global _values
+    with open(path, "rb") as f:
+        values = tomllib.load(f)
+    with _lock:
+        _values = values
+    return values
+
+
+def _file_values():
+    global _values
+    with _lock:
+        if _values is None:
+            _values = {}
+            if CONFIG_PATH:
+                with open(CONFIG_PATH, "rb") as f:
+                    _values = tomllib.load(f)
+        return _values
+
+
+def setting(name, default=None):
+    """Read a setting from the environment, then the config file, then Streamlit secrets."""
+    if os.environ.get(name):
+        return os.environ[name]
+    values = _file_values()
+    if name in values:
+        return values[name]
+    # Only a Streamlit app has secrets; a headless run shouldn't pay for importing it
+    if "streamlit" not in sys.modules:
+        return default
+    try:
+        return sys.modules["streamlit"].secrets.get(name, default)
+    except Exception:
+        return default
+
+
+def require(name):
+    value = setting(name)
+    if not value:
+        raise RuntimeError(
+            f"Missing {name}: set it in the environment, the APP_CONFIG file or Streamlit secrets."
+        )
+    return value
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from supabase_client import supabase
+
+# Rows per upsert request
+CHUNK_SIZE = 500
+
+
+def upsert_records(table, unique_field, records, chunk_size=CHUNK_SIZE):
+    """Upsert records in one request per chunk and return {unique value: id}.
+
+    Only updated_at is sent; created_at comes from the column default, so it
+    is set for new rows and left untouched for existing ones.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    ids = {}
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        for record in chunk:
+            record.pop("created_at", None)
+            record["updated_at"] = now
+        res = supabase.table(table).upsert(chunk, on_conflict=unique_field).execute()
+        for row in res.data or []:
+            ids[row[unique_field]] = row.get("id")
+    return ids
+
+
+class BatchWriter:
+    """Collect records per table and flush them as batched upserts"""
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.pending = {}
+
+    def add(self, table, unique_field, record):
+        """Queue a record; a later record with the same key replaces the earlier one"""
+        key = (table, unique_field)
+        self.pending.setdefault(key, {})[record[unique_field]] = record
+
+    def flush(self, table=None):
+        """Write queued records and return {table: {unique value: id}}"""
+        ids = {}
+        for (name, unique_field) in list(self.pending):
+            if table is not None and name != table:
+                continue
+            records = list(self.pending.pop((name, unique_field)).values())
+            ids.setdefault(name, {}).update(
+                upsert_records(name, unique_field, records, self.chunk_size)
+            )
+        return ids
@@ -0,0 +1,120 @@
+import hashlib
+import re
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# MinHash signature length and LSH banding: 20 bands of 3 rows make pairs at
+# Jaccard 0.6 candidates ~99% of the time while unrelated titles rarely collide
+NUM_PERM = 60
+ROWS_PER_BAND = 3
+# Shingle-set Jaccard similarity at or above which two texts are near-duplicates
+THRESHOLD = 0.6
+# Fields compared by default; an item's fields are matched against the same field only
+FIELDS = ("title", "summary")
+# Texts with fewer words than this carry too little signal to cluster on
+MIN_WORDS = 3
+
+_PRIME = (1 << 61) - 1
+_permutations = None
+
+
+def _coefficients():
+    global _permutations
+    if _permutations is None:
+        rng = np.random.RandomState(20261016)
+        _permutations = (
+            rng.randint(1, _PRIME, NUM_PERM, dtype=np.uint64),
+            rng.randint(0, _PRIME, NUM_PERM, dtype=np.uint64),
+        )
+    return _permutations
+
+
+def normalize(text):
+    """Lowercase words of a headline or summary, without HTML and a trailing " - Publisher"."""
+    text = re.sub(r"<[^>]+>", " ", text or "")
+    text = re.sub(r"\s+[-|–—]\s+[^-|–—]{1,40}$", "", text.strip())
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def shingles(text):
+    """Words and word pairs of the normalized text."""
+    words = normalize(text)
+    if len(words) < MIN_WORDS:
+        return set()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(features):
+    """NUM_PERM-value MinHash signature of a set of strings."""
+    a, b = _coefficients()
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little") for f in features],
+        dtype=np.uint64,
+    )
+    # (a * h + b) mod p, computed with wrapping uint64 arithmetic as in datasketch;
+    # a Python int operand would promote to float64 on older NumPy
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] * a + b) % np.uint64(_PRIME)
+    return (permuted & np.uint64(0xFFFFFFFF)).min(axis=0)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def cluster(items, fields=FIELDS, threshold=THRESHOLD):
+    """Group near-duplicate items; returns lists of indices in input order.
+
+    Items are bucketed by LSH bands of their MinHash signatures, so only
+    items sharing a band are compared, and candidates are confirmed with the
+    exact shingle Jaccard similarity.
+    """
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for field in fields:
+        sets = [shingles(item.get(field)) for item in items]
+        buckets = {}
+        for i, features in enumerate(sets):
+            if not features:
+                continue
+            signature = minhash(features)
+            for band in range(NUM_PERM // ROWS_PER_BAND):
+                key = (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+                buckets.setdefault(key, []).append(i)
+
+        for members in buckets.values():
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j and jaccard(sets[i], sets[j]) >= threshold:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = {}
+    for i in range(len(items)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def dedupe(items, fields=FIELDS, threshold=THRESHOLD, known=()):
+    """Keep the first item of each near-duplicate cluster, with its size as "cluster_size".
+
+    Items that are near-duplicates of an entry in known (e.g. already stored
+    articles) are dropped. Items that are already representatives count with
+    their own cluster_size.
+    """
+    known = list(known)
+    pool = known + list(items)
+    representatives = []
+    for members in cluster(pool, fields, threshold):
+        if members[0] < len(known):
+            continue
+        size = sum(pool[m].get("cluster_size", 1) for m in members)
+        representatives.append((members[0], {**pool[members[0]], "cluster_size": size}))
+    return [item for _, item in sorted(representatives, key=lambda pair: pair[0])]
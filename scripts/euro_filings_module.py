@@ -1,12 +1,13 @@
-import feedparser
 from datetime import datetime, timezone
 from supabase_client import supabase
+from scripts.dedup import dedupe
+from scripts.feed_cache import get_feed
 
 def fetch_filings(company_name):
     """Fetch Google News RSS for filings-like keywords"""
     query = f"{company_name} filing OR prospectus OR report OR notice"
     rss_url = f"https://news.google.com/rss/search?q={query.replace(' ','+')}"
-    feed = feedparser.parse(rss_url)
+    feed = get_feed(rss_url)
     filings = []
     for entry in feed.entries[:20]:
         filings.append({
@@ -15,7 +16,7 @@ def fetch_filings(company_name):
             "published": entry.get("published"),
             "summary": entry.get("summary")
         })
-    return filings
+    return dedupe(filings)
 
 def push_filings(ticker, company_name):
     filings = fetch_filings(company_name)
@@ -1,34 +1,48 @@
-import yfinance as yf
+import asyncio
+import hashlib
+import re
 from datetime import datetime, timezone, timedelta
-import feedparser
+from urllib.parse import parse_qsl, urlencode, urlsplit
 from supabase_client import supabase
+from scripts.dedup import dedupe
+from scripts.feed_cache import get_feed
+from scripts.lazy import lazy_import
+from scripts.tracing import span
+from scripts.upstream import YFINANCE_HOST, UpstreamError, call
 
-def fetch_news(ticker, company_name, days=14):
-    """Fetch news (Yahoo Finance + Google News RSS)"""
-    news_items = []
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+yf = lazy_import("yfinance")
+
+# Concurrent requests allowed per upstream host
+HOST_LIMIT = 8
+# Stored articles a new fetch is checked against for near-duplicates
+RECENT_LIMIT = 500
+YAHOO_HOST = "finance.yahoo.com"
+GOOGLE_NEWS_HOST = "news.google.com"
+# Query parameters that only track the click; the rest can identify the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "mc_cid", "mc_eid", "ocid", "cmpid",
+    "guccounter", "guce_referrer", "guce_referrer_sig",
+}
 
-    # Yahoo Finance
-    try:
-        ynews = yf.Ticker(ticker).news
-    except Exception:
-        ynews = []
 
+def _yahoo_items(ynews, cutoff):
+    items = []
     for item in ynews or []:
         dt = datetime.fromtimestamp(item.get("providerPublishTime", 0), tz=timezone.utc)
         if dt < cutoff:
             continue
-        news_items.append({
+        items.append({
             "source": "Yahoo Finance",
             "title": item.get("title"),
             "link": item.get("link"),
             "publisher": item.get("publisher"),
             "published": dt.isoformat()
         })
+    return items
 
-    # Google News RSS
-    rss_url = f"https://news.google.com/rss/search?q={company_name.replace(' ','+')}"
-    feed = feedparser.parse(rss_url)
+
+def _google_items(feed, cutoff):
+    items = []
     for entry in feed.entries:
         published_parsed = entry.get("published_parsed")
         if published_parsed:
@@ -39,24 +53,168 @@ def fetch_news(ticker, company_name, days=14):
                 continue
         else:
             dt = None
-        news_items.append({
+        items.append({
             "source": "Google News RSS",
             "title": entry.get("title"),
             "link": entry.get("link"),
             "published": dt.isoformat() if dt else None
         })
-    return news_items
+    return items
+
+
+async def _fetch_yahoo(ticker, cutoff, limits):
+    """Return (items, error); a failed Yahoo fetch is reported, Google News still covers the ticker."""
+    async with limits[YAHOO_HOST]:
+        try:
+            with span("yfinance.news", ticker=ticker):
+                ynews = await asyncio.to_thread(call, YFINANCE_HOST, lambda: yf.Ticker(ticker).news)
+        except UpstreamError as e:
+            return [], f"Yahoo Finance: {e}"
+    return _yahoo_items(ynews, cutoff), None
+
+
+async def _fetch_google(company_name, cutoff, limits):
+    """Return (items, error), like _fetch_yahoo."""
+    rss_url = f"https://{GOOGLE_NEWS_HOST}/rss/search?q={company_name.replace(' ','+')}"
+    # The feed cache is blocking; it answers repeats from memory/disk or with a 304
+    async with limits[GOOGLE_NEWS_HOST]:
+        try:
+            feed = await asyncio.to_thread(get_feed, rss_url)
+        except UpstreamError as e:
+            return [], f"Google News: {e}"
+    return _google_items(feed, cutoff), None
 
-def push_news(ticker, company_name):
-    news_items = fetch_news(ticker, company_name)
-    record = {
-        "company_name": company_name,
-        "ticker": ticker,
-        "run_timestamp": datetime.now(timezone.utc).isoformat(),
-        "news": news_items
+
+async def _fetch_news_many(pairs, days, per_host):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    limits = {
+        YAHOO_HOST: asyncio.Semaphore(per_host),
+        GOOGLE_NEWS_HOST: asyncio.Semaphore(per_host),
     }
-    # Replace latest news
-    supabase.table("news").delete().eq("ticker", ticker).execute()
-    supabase.table("news").insert(record).execute()
-    supabase.table("news_history").insert(record).execute()
+
+    async def fetch_one(ticker, company_name):
+        (yahoo, yahoo_error), (google, google_error) = await asyncio.gather(
+            _fetch_yahoo(ticker, cutoff, limits),
+            _fetch_google(company_name, cutoff, limits),
+        )
+        error = "; ".join(filter(None, (yahoo_error, google_error))) or None
+        # The same wire story is syndicated under slightly different headlines
+        return ticker, dedupe(yahoo + google), error
+
+    results = await asyncio.gather(*(fetch_one(t, n) for t, n in pairs))
+    return {t: items for t, items, _ in results}, {t: error for t, _, error in results if error}
+
+
+def fetch_news_many(pairs, days=14, per_host=HOST_LIMIT, errors=None):
+    """Fetch news for many (ticker, company_name) pairs concurrently.
+
+    Returns {ticker: news_items}. Both sources are fetched at the same time
+    through the shared feed cache, with at most per_host requests per host.
+    Tickers for which a source failed are added to errors, if given.
+    """
+    news, failed = asyncio.run(_fetch_news_many(list(pairs), days, per_host))
+    if errors is not None:
+        errors.update(failed)
+    return news
+
+
+def fetch_news(ticker, company_name, days=14, errors=None):
+    """Fetch news (Yahoo Finance + Google News RSS)"""
+    return fetch_news_many([(ticker, company_name)], days, errors=errors)[ticker]
+
+
+def article_hash(item):
+    """Hash an article by its normalized link, falling back to its title"""
+    link = item.get("link") or ""
+    if link:
+        parts = urlsplit(link.strip())
+        params = sorted(
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+        )
+        key = f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+        if params:
+            key += f"?{urlencode(params)}"
+    else:
+        key = re.sub(r"\W+", " ", (item.get("title") or "").lower()).strip()
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _recent_articles(ticker, days):
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    res = (
+        supabase.table("news_items")
+        .select("title, summary")
+        .eq("ticker", ticker)
+        .gte("published", cutoff)
+        .order("published", desc=True, nullsfirst=False)
+        .limit(RECENT_LIMIT)
+        .execute()
+    )
+    return res.data or []
+
+
+def push_news(ticker, company_name, days=14):
+    """Store articles not seen before for the ticker and record them as a history delta
+
+    Near-duplicates of each other, or of articles stored in the last `days`,
+    are stored once.
+    """
+    errors = {}
+    news_items = fetch_news(ticker, company_name, days, errors)
+    if errors and not news_items:
+        # Nothing to store; let the caller record the failure instead of "no news"
+        raise UpstreamError(errors[ticker])
+    run_timestamp = datetime.now(timezone.utc).isoformat()
+
+    recent = _recent_articles(ticker, days)
+    fresh = dedupe(news_items, known=recent) if recent else news_items
+
+    rows = {}
+    for item in fresh:
+        key = article_hash(item)
+        rows.setdefault(key, {
+            "ticker": ticker,
+            "company_name": company_name,
+            "article_hash": key,
+            "source": item.get("source"),
+            "title": item.get("title"),
+            "link": item.get("link"),
+            "publisher": item.get("publisher"),
+            "summary": item.get("summary"),
+            "published": item.get("published"),
+            "cluster_size": item.get("cluster_size", 1),
+        })
+    if not rows:
+        return news_items
+
+    # Existing (ticker, article_hash) pairs are skipped; only new rows come back
+    res = (
+        supabase.table("news_items")
+        .upsert(list(rows.values()), on_conflict="ticker,article_hash", ignore_duplicates=True)
+        .execute()
+    )
+    new_items = res.data or []
+    if new_items:
+        supabase.table("news_history").insert({
+            "company_name": company_name,
+            "ticker": ticker,
+            "run_timestamp": run_timestamp,
+            "news": new_items,
+        }).execute()
     return news_items
+
+
+def get_news_page(ticker, page=0, page_size=10):
+    """Return (items, has_more) for one page of a ticker's news, newest first"""
+    start = page * page_size
+    res = (
+        supabase.table("news_items")
+        .select("source, title, link, publisher, summary, published, cluster_size")
+        .eq("ticker", ticker)
+        .order("published", desc=True, nullsfirst=False)
+        .range(start, start + page_size)
+        .execute()
+    )
+    items = res.data or []
+    return items[:page_size], len(items) > page_size
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from scripts.lazy import lazy_import
+from scripts.tracing import host, span
+from scripts.upstream import UpstreamError, call, check_status
+
+feedparser = lazy_import("feedparser")
+httpx = lazy_import("httpx")
+
+# Raw feed bodies with their ETag/Last-Modified validators, shared by every process on the host
+CACHE_PATH = Path(os.environ.get("FEED_CACHE_PATH", ".cache/feeds.sqlite"))
+# Seconds a feed is served without asking the server; after that it is revalidated
+FRESH_TTL = 5 * 60
+# Seconds a feed and its validators are kept at all
+KEEP_TTL = 24 * 60 * 60
+# Parsed feeds kept in memory
+MEMORY_ENTRIES = 256
+
+_memory = OrderedDict()
+_inflight = {}
+_lock = threading.Lock()
+_client = None
+_stats = {"memory_hits": 0, "disk_hits": 0, "not_modified": 0, "fetched": 0, "coalesced": 0, "errors": 0}
+
+
+def _connect():
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS feeds (
+            url TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL
+        )"""
+    )
+    return conn
+
+
+def _http():
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(timeout=20, follow_redirects=True, headers={"User-Agent": "Mozilla/5.0"})
+    return _client
+
+
+def _count(stat):
+    with _lock:
+        _stats[stat] += 1
+
+
+def _remember(url, fetched_at, feed):
+    with _lock:
+        _memory[url] = (fetched_at, feed)
+        _memory.move_to_end(url)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _load(url, ttl):
+    """Serve url from disk while fresh, otherwise revalidate or download it."""
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM feeds WHERE url = ?", (url,)
+        ).fetchone()
+        if row and now - row[3] < ttl:
+            _count("disk_hits")
+            return row[3], feedparser.parse(zlib.decompress(row[0]))
+
+        headers = {}
+        if row and row[1]:
+            headers["If-None-Match"] = row[1]
+        if row and row[2]:
+            headers["If-Modified-Since"] = row[2]
+        def fetch():
+            response = _http().get(url, headers=headers)
+            check_status(response.status_code)
+            return response
+
+        error = None
+        try:
+            with span("feed.fetch", host=host(url)) as tags:
+                response = call(host(url), fetch)
+                tags["status"] = response.status_code
+        except (httpx.HTTPError, UpstreamError) as e:
+            response, error = None, e
+
+        if response is not None and response.status_code == 304 and row:
+            _count("not_modified")
+            conn.execute("UPDATE feeds SET fetched_at = ? WHERE url = ?", (now, url))
+            return now, feedparser.parse(zlib.decompress(row[0]))
+
+        if response is None or not response.is_success:
+            _count("errors")
+            if not row:
+                # An empty feed would read as "nothing published"; callers must see the failure
+                reason = error or f"HTTP {response.status_code}"
+                raise UpstreamError(f"{host(url)}: feed unavailable ({reason})") from error
+            # Serve the last good copy without caching the failure
+            return 0.0, feedparser.parse(zlib.decompress(row[0]))
+
+        _count("fetched")
+        conn.execute(
+            "INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?)",
+            (
+                url,
+                zlib.compress(response.content),
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+                now,
+            ),
+        )
+        conn.execute("DELETE FROM feeds WHERE fetched_at < ?", (now - KEEP_TTL,))
+        return now, feedparser.parse(response.content)
+    finally:
+        conn.close()
+
+
+def get_feed(url, ttl=FRESH_TTL):
+    """Return the parsed feed at url (as feedparser.parse would), through the feed cache.
+
+    Fresh feeds come from memory or disk; stale ones are revalidated with a
+    conditional GET. Concurrent calls for the same url share one request. A
+    failed fetch serves the last good copy, or raises UpstreamError if there
+    is none.
+    """
+    with _lock:
+        cached = _memory.get(url)
+        if cached and time.time() - cached[0] < ttl:
+            _memory.move_to_end(url)
+            _stats["memory_hits"] += 1
+            return cached[1]
+        future = _inflight.get(url)
+        owner = future is None
+        if owner:
+            future = _inflight[url] = Future()
+        else:
+            _stats["coalesced"] += 1
+
+    if not owner:
+        return future.result()
+    try:
+        fetched_at, feed = _load(url, ttl)
+        if fetched_at:
+            _remember(url, fetched_at, feed)
+        future.set_result(feed)
+        return feed
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(url, None)
+
+
+def cache_stats():
+    """Return hit/miss counters for this process and the number of feeds on disk"""
+    conn = _connect()
+    try:
+        feeds, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM feeds").fetchone()
+    finally:
+        conn.close()
+    with _lock:
+        return {**_stats, "feeds": feeds, "bytes": size}
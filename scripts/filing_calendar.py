@@ -0,0 +1,152 @@
+import csv
+import io
+import re
+import datetime
+import pandas as pd
+from supabase_client import supabase
+from scripts.db_writer import upsert_records
+
+# Rows per upsert request on import, and per page on export
+CHUNK_SIZE = 500
+PAGE_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "company_name",
+    "ticker",
+    "next_earnings_date",
+    "pending_filing",
+    "filing_source",
+    "last_checked",
+]
+
+# Common spellings of the calendar columns in exported earnings calendars
+COLUMN_ALIASES = {
+    "ticker": ["ticker", "symbol", "code"],
+    "company_name": ["company_name", "company", "name", "companyname"],
+    "next_earnings_date": ["next_earnings_date", "earnings_date", "report_date", "date", "expected_date"],
+    "filing_source": ["filing_source", "source"],
+}
+TICKER_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9.\-^=]{0,14}$")
+
+
+def read_calendar(file, filename=None):
+    """Read an earnings calendar from a CSV or Parquet file (path or upload)."""
+    name = (filename or getattr(file, "name", None) or str(file)).lower()
+    if name.endswith(".parquet") or name.endswith(".pq"):
+        return pd.read_parquet(file)
+    return pd.read_csv(file, dtype=str, keep_default_na=False)
+
+
+def _rename_columns(frame):
+    lookup = {re.sub(r"[^a-z]", "", c.lower()): c for c in frame.columns}
+    renames = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            original = lookup.get(alias.replace("_", ""))
+            if original is not None:
+                renames[original] = column
+                break
+    return frame.rename(columns=renames)
+
+
+def _text(frame, column):
+    """Column as stripped strings; nulls (NaN/None from Parquet) become ""."""
+    return frame[column].fillna("").astype(str).str.strip()
+
+
+def validate_calendar(frame, source="import"):
+    """Normalize a calendar frame into filings records.
+
+    Returns (records, errors). Each error is {"row", "ticker", "error"}, where
+    row is the 1-based data row in the file. Rows with errors are skipped, and
+    a ticker listed twice keeps its last row.
+    """
+    frame = _rename_columns(frame)
+    missing = [c for c in ("ticker", "company_name", "next_earnings_date") if c not in frame.columns]
+    if missing:
+        return [], [{"row": None, "ticker": None, "error": f"missing column(s): {', '.join(missing)}"}]
+
+    tickers = _text(frame, "ticker").str.upper()
+    companies = _text(frame, "company_name")
+    dates = pd.to_datetime(frame["next_earnings_date"], errors="coerce", utc=True).dt.date
+    sources = (
+        _text(frame, "filing_source").replace("", source)
+        if "filing_source" in frame.columns else pd.Series(source, index=frame.index)
+    )
+
+    problems = pd.Series("", index=frame.index)
+    problems[dates.isna()] = "invalid next_earnings_date"
+    problems[companies.isin(["", "nan", "None"])] = "missing company_name"
+    problems[~tickers.str.match(TICKER_PATTERN)] = "invalid ticker"
+    # Only valid rows compete, so an invalid later row does not drop a good one
+    duplicated = tickers[problems.eq("")].duplicated(keep="last")
+    problems[duplicated[duplicated].index] = "duplicate ticker (a later row wins)"
+
+    errors = [
+        {"row": position + 1, "ticker": tickers.iloc[position] or None, "error": problems.iloc[position]}
+        for position in range(len(frame))
+        if problems.iloc[position]
+    ]
+
+    valid = problems.eq("")
+    now = datetime.datetime.utcnow().isoformat()
+    records = [
+        {
+            "company_name": company,
+            "ticker": ticker,
+            "next_earnings_date": date.isoformat(),
+            "pending_filing": True,
+            "last_checked": now,
+            "filing_source": filing_source,
+            # Rescheduling resets the retry state, as save_or_update_filing does
+            "attempts": 0,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_error": None,
+        }
+        for ticker, company, date, filing_source in zip(
+            tickers[valid], companies[valid], dates[valid], sources[valid]
+        )
+    ]
+    return records, errors
+
+
+def import_calendar(records, chunk_size=CHUNK_SIZE):
+    """Upsert validated calendar records into filings, one request per chunk."""
+    return len(upsert_records("filings", "ticker", records, chunk_size))
+
+
+def iter_filings(columns=EXPORT_COLUMNS, page_size=PAGE_SIZE):
+    """Yield pages of active filings ordered by ticker, using keyset pagination."""
+    last = None
+    while True:
+        query = supabase.table("filings").select(", ".join(columns)).order("ticker")
+        if last is not None:
+            query = query.gt("ticker", last)
+        page = query.limit(page_size).execute().data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]["ticker"]
+
+
+def export_filings_csv(file, columns=EXPORT_COLUMNS, page_size=PAGE_SIZE, max_rows=None):
+    """Stream the active filings as CSV into a binary file object, page by page.
+
+    Stops after max_rows rows, if given. Returns the number of rows written.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    for page in iter_filings(columns, page_size):
+        if max_rows is not None:
+            page = page[:max_rows - rows]
+        writer.writerows(page)
+        rows += len(page)
+        if rows == max_rows:
+            break
+    # Hand the file back to the caller open
+    text.detach()
+    return rows
@@ -0,0 +1,79 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from supabase_client import supabase
+from scripts.filings import MAX_ATTEMPTS, WORKER_ID, process_due_filings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls of the due-filings queue
+POLL_INTERVAL = 60
+JOB = "filings"
+
+
+def record_run(processed, failed, job=JOB, error=None):
+    """Record this worker's latest run, and the error that broke it if any, for the dashboard."""
+    supabase.table("worker_runs").upsert({
+        "worker_id": WORKER_ID,
+        "job": job,
+        "last_run_at": datetime.now(timezone.utc).isoformat(),
+        "last_processed": processed,
+        "last_failed": failed,
+        "last_error": error[:500] if error else None,
+    }, on_conflict="worker_id,job").execute()
+
+
+def run_once(max_workers=4):
+    """Process one round of due filings and record the run."""
+    error = None
+    try:
+        processed, failed = process_due_filings(max_workers=max_workers)
+    except Exception as e:
+        # A broken RPC or credential fails the whole round, not one filing
+        logger.exception("Filing worker round failed")
+        processed, failed, error = 0, 1, f"{type(e).__name__}: {e}"
+    record_run(processed, failed, error=error)
+    return processed
+
+
+def run_forever(max_workers=4, poll_interval=POLL_INTERVAL, stop_event=None):
+    """Poll the queue until stopped; rounds that fill every slot poll again immediately."""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        processed = run_once(max_workers)
+        if processed < max_workers:
+            stop_event.wait(poll_interval)
+
+
+def start_background_worker(max_workers=4, poll_interval=POLL_INTERVAL):
+    """Start the worker loop in a daemon thread and return its stop event."""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_forever,
+        args=(max_workers, poll_interval, stop_event),
+        name="filing-worker",
+        daemon=True,
+    )
+    thread.start()
+    return stop_event
+
+
+def get_queue_status():
+    """Return queue depth, in-flight count and last run time."""
+    status = supabase.rpc("filing_queue_status", {"p_max_attempts": MAX_ATTEMPTS}).execute().data or {}
+    runs = (
+        supabase.table("worker_runs")
+        .select("*")
+        .eq("job", JOB)
+        .order("last_run_at", desc=True)
+        .limit(10)
+        .execute()
+        .data or []
+    )
+    status["workers"] = runs
+    return status
+
+
+if __name__ == "__main__":
+    print(f"Filing worker {WORKER_ID} polling every {POLL_INTERVAL}s")
+    run_forever()
@@ -1,10 +1,29 @@
 import datetime
+import math
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from supabase_client import supabase
-from scripts.scraper import find_and_extract_latest_filing
+from scripts.scraper import CANDIDATES, EXTRACT_PROCESSES, EXTRACT_TIMEOUT, find_and_extract_latest_filing
+from scripts.db_writer import upsert_records
+from scripts.freshness import mark_refreshed
+
+# Identifies this process when it leases filings
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+LEASE_SECONDS = 10 * 60
+# Attempts after which a filing is left for an admin; passed to the queue functions
+MAX_ATTEMPTS = 5
+# Allowance for a filing's feed fetch, retries included
+FEED_SECONDS = 60
+# Written with every (re)scheduled filing so one that ran out of attempts is retried
+REQUEUE_FIELDS = {"attempts": 0, "lease_owner": None, "lease_expires_at": None, "last_error": None}
 
 
 def save_or_update_filing(ticker, company_name, next_date, source="manual"):
-    """Insert or update a filing record in the 'filings' table."""
+    """Insert or update a filing record in the 'filings' table with one upsert.
+
+    A rescheduled filing starts over: its attempts, lease and last error are reset.
+    """
     record = {
         "company_name": company_name,
         "ticker": ticker,
@@ -12,15 +31,11 @@ def save_or_update_filing(ticker, company_name, next_date, source="manual"):
         "pending_filing": True,
         "last_checked": datetime.datetime.utcnow().isoformat(),
         "filing_source": source,
+        **REQUEUE_FIELDS,
     }
 
-    existing = supabase.table("filings").select("*").eq("ticker", ticker).execute().data
-    if existing:
-        supabase.table("filings").update(record).eq("ticker", ticker).execute()
-        return "updated"
-    else:
-        supabase.table("filings").insert(record).execute()
-        return "inserted"
+    upsert_records("filings", "ticker", [record])
+    return "saved"
 
 
 def archive_filing_to_history(filing, filing_data=None):
@@ -52,24 +67,76 @@ def archive_filing_to_history(filing, filing_data=None):
     supabase.table("filings").delete().eq("ticker", filing["ticker"]).execute()
 
 
-def process_expired_or_due_filings():
-    """Detect filings that are due today or past due and scrape their data."""
-    now = datetime.datetime.utcnow()
-    due_filings = (
-        supabase.table("filings")
-        .select("*")
-        .lte("next_earnings_date", now.isoformat())
-        .execute()
-        .data or []
-    )
+def claim_due_filings(limit, worker_id=WORKER_ID, lease_seconds=LEASE_SECONDS):
+    """Lease up to `limit` due filings for this worker; other workers skip them."""
+    res = supabase.rpc(
+        "claim_due_filings",
+        {"p_worker": worker_id, "p_limit": limit, "p_lease_seconds": lease_seconds, "p_max_attempts": MAX_ATTEMPTS},
+    ).execute()
+    return res.data or []
+
+
+def release_filing(filing, error):
+    """Give a failed filing back to the queue with its error recorded."""
+    supabase.table("filings").update({
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "attempts": (filing.get("attempts") or 0) + 1,
+        "last_error": error[:500],
+    }).eq("ticker", filing["ticker"]).eq("lease_owner", filing["lease_owner"]).execute()
+
+
+def process_filing(filing):
+    """Scrape a claimed filing and move it to history.
+
+    A failed feed fetch raises, so the filing is released for another attempt
+    instead of being archived without data.
+    """
+    filing_data = find_and_extract_latest_filing(filing["company_name"])
+    archive_filing_to_history(filing, filing_data)
+    mark_refreshed(filing["ticker"], ["filings"])
+
+
+def round_timeout(max_workers):
+    """Seconds a round of max_workers filings may take.
+
+    Every filing's candidates share the EXTRACT_PROCESSES extraction slots,
+    so a full round extracts in several waves of EXTRACT_TIMEOUT each.
+    """
+    waves = math.ceil(max_workers * CANDIDATES / EXTRACT_PROCESSES)
+    return FEED_SECONDS + waves * EXTRACT_TIMEOUT
+
+
+def process_due_filings(max_workers=4, task_timeout=None):
+    """Claim due filings, scrape them concurrently and return (processed, failed).
+
+    Every extraction is killed at EXTRACT_TIMEOUT, so a round is bounded by
+    task_timeout (default: round_timeout) and the lease is twice that.
+    """
+    task_timeout = task_timeout or round_timeout(max_workers)
+    due_filings = claim_due_filings(max_workers, lease_seconds=max(LEASE_SECONDS, 2 * task_timeout))
+    if not due_filings:
+        return 0, 0
+
+    # No thread outlives the round, so none keeps scraping a filing whose
+    # lease another worker may already hold
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(process_filing, filing): filing for filing in due_filings}
 
     processed = 0
-    for filing in due_filings:
-        filing_data = find_and_extract_latest_filing(filing["company_name"])
-        archive_filing_to_history(filing, filing_data)
-        processed += 1
+    for future in futures:
+        error = future.exception()
+        if error is None:
+            processed += 1
+        else:
+            release_filing(futures[future], str(error))
+
+    return processed, len(due_filings) - processed
 
-    return processed
+
+def process_expired_or_due_filings(max_workers=4):
+    """Detect filings that are due today or past due and scrape their data."""
+    return process_due_filings(max_workers)[0]
 
 
 def get_next_filing():
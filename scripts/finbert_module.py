@@ -1,27 +1,247 @@
-import streamlit as st
-import requests
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from scripts.config import setting
+from scripts.lazy import lazy_import
+from scripts.tracing import bind, host, span
+from scripts.upstream import UpstreamError, call, check_status
 
-def run_finbert_analysis(text):
-    """Send text to FinBERT for financial sentiment/analysis using Streamlit Secrets."""
-    api_token = st.secrets.get("HUGGINGFACE_API_TOKEN", None)
+requests = lazy_import("requests")
+
+DEFAULT_API_URL = "https://api-inference.huggingface.co/models/ProsusAI/finbert"
+# Texts per inference request
+BATCH_SIZE = 16
+# Memoized results, keyed by a hash of (endpoint, text)
+CACHE_PATH = Path(os.environ.get("FINBERT_CACHE_PATH", ".cache/finbert.sqlite"))
+# FinBERT sees at most 512 tokens; windows stay below that to leave room for
+# the estimate being off and for the special tokens
+WINDOW_TOKENS = 384
+MAX_WORKERS = 4
+# Seconds one inference request may take
+REQUEST_TIMEOUT = 30
+
+# One pooled session so batches reuse the same connection, created on first request
+_session = None
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def _connect():
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+    return conn
+
+
+def _key(api_url, text):
+    return hashlib.sha256(f"{api_url}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _request_timeout(deadline):
+    """REQUEST_TIMEOUT, cut to the time left before deadline (a time.monotonic() value)."""
+    if deadline is None:
+        return REQUEST_TIMEOUT
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise UpstreamError("FinBERT scoring ran out of time.")
+    return min(REQUEST_TIMEOUT, left)
+
+
+def score_texts(texts, api_url=None, batch_size=BATCH_SIZE, timeout=None):
+    """Return FinBERT label scores for each text, as a list of [{label, score}, ...].
+
+    Cached texts are answered from disk; the rest are sent in batches of
+    batch_size over a pooled session. With timeout, every request, retries
+    included, must finish within that many seconds or UpstreamError is raised.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    api_url = api_url or setting("FINBERT_API_URL", DEFAULT_API_URL)
+    api_token = setting("HUGGINGFACE_API_TOKEN")
+    if not api_token and api_url == DEFAULT_API_URL:
+        raise RuntimeError("Missing Hugging Face API token (HUGGINGFACE_API_TOKEN).")
+    headers = {"Authorization": f"Bearer {api_token}"} if api_token else {}
+
+    keys = [_key(api_url, text) for text in texts]
+    conn = _connect()
+    try:
+        results = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            results.update(
+                (key, json.loads(result))
+                for key, result in conn.execute(
+                    f"SELECT key, result FROM scores WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in results:
+                missing.setdefault(key, text)
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+
+            def post():
+                response = _get_session().post(
+                    api_url,
+                    headers=headers,
+                    json={"inputs": [text for _, text in batch]},
+                    timeout=_request_timeout(deadline),
+                )
+                # The hosted model answers 503 while it is loading; that is retried too
+                check_status(response.status_code)
+                return response
 
-    if not api_token:
-        return "⚠️ Missing Hugging Face API token in Streamlit secrets."
+            with span("inference.post", host=host(api_url), batch=len(batch)):
+                response = call(host(api_url), post)
+            response.raise_for_status()
+            scores = response.json()
+            if not isinstance(scores, list) or len(scores) != len(batch):
+                raise ValueError("Unexpected FinBERT response format.")
+            for (key, _), score in zip(batch, scores):
+                results[key] = score
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?)",
+                [(key, json.dumps(results[key])) for key, _ in batch],
+            )
+    finally:
+        conn.close()
 
-    headers = {"Authorization": f"Bearer {api_token}"}
-    API_URL = "https://api-inference.huggingface.co/models/ProsusAI/finbert"
+    return [results[key] for key in keys]
 
+
+def estimate_tokens(text):
+    """Roughly count BERT word pieces: words, punctuation, and long words as several pieces."""
+    return sum(max(1, len(t) // 4) for t in re.findall(r"\w+|[^\w\s]", text))
+
+
+def chunk_text(text, max_tokens=WINDOW_TOKENS):
+    """Split text into sentence-aligned windows of at most max_tokens estimated tokens."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
+    chunks, current, size = [], [], 0
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence)
+        # A single sentence over the budget is cut on word boundaries
+        if tokens > max_tokens:
+            # Overlong "words" (long numbers, URLs) are cut by characters
+            words = [
+                w[i:i + max_tokens * 4]
+                for w in sentence.split()
+                for i in range(0, len(w), max_tokens * 4)
+            ]
+            pieces, piece, piece_size = [], [], 0
+            for word in words:
+                word_tokens = estimate_tokens(word)
+                if piece and piece_size + word_tokens > max_tokens:
+                    pieces.append(" ".join(piece))
+                    piece, piece_size = [], 0
+                piece.append(word)
+                piece_size += word_tokens
+            if piece:
+                pieces.append(" ".join(piece))
+        else:
+            pieces = [sentence]
+
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and size + piece_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += piece_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def score_long_text(text, api_url=None, max_tokens=WINDOW_TOKENS, max_workers=MAX_WORKERS, timeout=None):
+    """Score text of any length by chunking it and combining the chunk scores.
+
+    Chunks are scored in concurrent batches, all within timeout seconds if
+    given. Label probabilities are averaged with each chunk weighted by its
+    token count. Returns the overall label, score and probabilities, plus
+    per-chunk attributions.
+    """
+    chunks = chunk_text(text, max_tokens)
+    if not chunks:
+        return None
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def score(batch):
+        return score_texts(batch, api_url, timeout=deadline - time.monotonic() if deadline is not None else None)
+
+    batches = [chunks[i:i + BATCH_SIZE] for i in range(0, len(chunks), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        scored = [s for batch in pool.map(bind(score), batches) for s in batch]
+
+    weights = [estimate_tokens(chunk) for chunk in chunks]
+    total = sum(weights)
+    probabilities = {}
+    attributions = []
+    for chunk, weight, scores in zip(chunks, weights, scored):
+        for s in scores:
+            probabilities[s["label"]] = probabilities.get(s["label"], 0.0) + s["score"] * weight / total
+        top = max(scores, key=lambda x: x["score"])
+        attributions.append({
+            "text": chunk,
+            "weight": weight / total,
+            "label": top["label"],
+            "score": top["score"],
+        })
+
+    label = max(probabilities, key=probabilities.get)
+    return {
+        "label": label,
+        "score": probabilities[label],
+        "probabilities": probabilities,
+        "chunks": attributions,
+    }
+
+
+def format_long_text_result(result, top_chunks=5):
+    """Render a score_long_text result as markdown."""
+    lines = [
+        f"🧠 **FinBERT Sentiment:** {result['label']} "
+        f"({round(result['score'] * 100, 2)}% confidence, {len(result['chunks'])} chunk(s))",
+        "",
+        " · ".join(f"{k}: {round(v * 100, 1)}%" for k, v in sorted(result["probabilities"].items())),
+    ]
+    if len(result["chunks"]) > 1:
+        lines += ["", "**Most influential chunks:**"]
+        ranked = sorted(result["chunks"], key=lambda c: c["weight"] * c["score"], reverse=True)
+        for chunk in ranked[:top_chunks]:
+            preview = chunk["text"][:120] + ("…" if len(chunk["text"]) > 120 else "")
+            lines.append(
+                f"- *{chunk['label']}* ({round(chunk['score'] * 100, 1)}%, "
+                f"weight {round(chunk['weight'] * 100, 1)}%): {preview}"
+            )
+    return "\n".join(lines)
+
+
+def run_finbert_analysis(text):
+    """Send text to FinBERT for financial sentiment/analysis using Streamlit Secrets."""
     try:
-        response = requests.post(API_URL, headers=headers, json={"inputs": text}, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-
-        if isinstance(result, list) and len(result) > 0:
-            top = max(result[0], key=lambda x: x['score'])
-            sentiment = top['label']
-            score = round(top['score'] * 100, 2)
-            return f"🧠 **FinBERT Sentiment:** {sentiment} ({score}% confidence)"
+        result = score_long_text(text)
+        if result:
+            return format_long_text_result(result)
         else:
-            return "⚠️ Unexpected FinBERT response format."
+            return "⚠️ No text to analyze."
+    except RuntimeError as e:
+        return f"⚠️ {e}"
     except Exception as e:
         return f"❌ FinBERT error: {str(e)}"
@@ -0,0 +1,127 @@
+"""Local stand-in for the Hugging Face FinBERT inference endpoint.
+
+Run it and point the client at it to test throughput and latency offline:
+
+    python -m scripts.finbert_stub_server --port 8765 --latency-ms 150
+    FINBERT_API_URL=http://127.0.0.1:8765/models/ProsusAI/finbert streamlit run app.py
+
+Scores are deterministic and based on a small word list, so repeated runs
+return the same labels. --max-concurrency answers 429 to requests beyond that
+many in flight, and --loading-seconds answers 503 while the "model loads",
+as the hosted endpoint does, so client limits and retries can be exercised.
+The LLM analysis queue uses the same endpoint format:
+
+    LLM_MODEL_URL=http://127.0.0.1:8765/models/yiyanghkust/finbert-tone streamlit run app.py
+"""
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+POSITIVE = {
+    "growth", "increase", "increased", "profit", "profitable", "beat", "beats",
+    "strong", "record", "gain", "gains", "up", "upgrade", "outperform", "buy",
+}
+NEGATIVE = {
+    "loss", "losses", "decline", "declined", "debt", "miss", "missed", "weak",
+    "down", "downgrade", "underperform", "sell", "risk", "lawsuit", "cut",
+}
+
+
+def score_text(text):
+    """Return FinBERT-style label scores for one text."""
+    words = re.findall(r"[a-z]+", text.lower())
+    pos = sum(w in POSITIVE for w in words)
+    neg = sum(w in NEGATIVE for w in words)
+    logits = {"positive": pos, "negative": neg, "neutral": 1 + 0.1 * len(words) ** 0.5}
+    total = sum(math.exp(v) for v in logits.values())
+    scores = [{"label": label, "score": math.exp(v) / total} for label, v in logits.items()]
+    return sorted(scores, key=lambda s: s["score"], reverse=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    latency = 0.0
+    per_item_latency = 0.0
+    max_concurrency = 0
+    ready_at = 0.0
+    # Requests in flight, the most seen at once, and how many were turned away
+    in_flight = 0
+    peak = 0
+    rejected = 0
+    lock = threading.Lock()
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        inputs = payload.get("inputs", "")
+        texts = inputs if isinstance(inputs, list) else [inputs]
+
+        if time.monotonic() < Handler.ready_at:
+            left = Handler.ready_at - time.monotonic()
+            self._reply(503, {"error": "Model is currently loading", "estimated_time": left})
+            return
+        with Handler.lock:
+            if Handler.max_concurrency and Handler.in_flight >= Handler.max_concurrency:
+                Handler.rejected += 1
+                busy = True
+            else:
+                Handler.in_flight += 1
+                Handler.peak = max(Handler.peak, Handler.in_flight)
+                busy = False
+        if busy:
+            self._reply(429, {"error": "Too many concurrent requests"})
+            return
+        try:
+            time.sleep(self.latency + self.per_item_latency * len(texts))
+            self._reply(200, [score_text(str(t)) for t in texts])
+        finally:
+            with Handler.lock:
+                Handler.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8765, latency_ms=0, per_item_ms=0, max_concurrency=0, loading_seconds=0):
+    """Create the stand-in server; port 0 picks a free one (see server.server_address)."""
+    Handler.latency = latency_ms / 1000
+    Handler.per_item_latency = per_item_ms / 1000
+    Handler.max_concurrency = max_concurrency
+    Handler.ready_at = time.monotonic() + loading_seconds
+    Handler.in_flight = Handler.peak = Handler.rejected = 0
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(host="127.0.0.1", port=8765, latency_ms=0, per_item_ms=0, max_concurrency=0, loading_seconds=0):
+    """Start the stand-in server and block until interrupted."""
+    server = make_server(host, port, latency_ms, per_item_ms, max_concurrency, loading_seconds)
+    print(f"FinBERT stand-in listening on http://{host}:{port}/models/ProsusAI/finbert")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="fixed delay per request")
+    parser.add_argument("--per-item-ms", type=float, default=0, help="extra delay per input text")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="answer 429 beyond this many requests in flight")
+    parser.add_argument("--loading-seconds", type=float, default=0, help="answer 503 for this long after starting")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.latency_ms, args.per_item_ms, args.max_concurrency, args.loading_seconds)
@@ -0,0 +1,205 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from supabase_client import supabase
+from scripts.info_cache import GROUP_TTLS, METRIC_GROUPS
+from scripts.tracing import bind
+
+# Seconds each kind of data stays fresh. Fundamentals follow the yfinance info
+# cache groups. Override with FRESHNESS_MAX_AGES="news=900,valuation=1800".
+MAX_AGES = {
+    **GROUP_TTLS,
+    "recommendations": 24 * 60 * 60,
+    "news": 30 * 60,
+    "filings": 24 * 60 * 60,
+}
+
+
+def _parse_max_ages(spec):
+    """{kind: seconds} from "kind=seconds,..."; malformed entries are skipped."""
+    ages = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, seconds = entry.partition("=")
+        try:
+            ages[kind.strip()] = int(seconds)
+        except ValueError:
+            # A typo in the environment keeps the default rather than breaking every page import
+            continue
+    return {kind: seconds for kind, seconds in ages.items() if kind and seconds >= 0}
+
+
+MAX_AGES.update(_parse_max_ages(os.environ.get("FRESHNESS_MAX_AGES", "")))
+
+FUNDAMENTAL_KINDS = set(GROUP_TTLS) | {"recommendations"}
+MAX_WORKERS = 4
+
+_pool = None
+_inflight = {}
+_versions = {}
+_lock = threading.Lock()
+
+
+def kinds_for(metrics):
+    """Fundamentals kinds behind a metric selection; the company row always needs the profile."""
+    kinds = {"profile"}
+    for metric in metrics:
+        if metric in METRIC_GROUPS:
+            kinds.add(METRIC_GROUPS[metric])
+        elif metric == "recommendations":
+            kinds.add("recommendations")
+    return kinds
+
+
+def load_state(ticker):
+    """Return {kind: {refreshed_at, attempted_at, error}} for a ticker."""
+    res = (
+        supabase.table("refresh_state")
+        .select("kind, refreshed_at, attempted_at, error")
+        .eq("ticker", ticker)
+        .execute()
+    )
+    return {row["kind"]: row for row in res.data or []}
+
+
+def age(state, kind, now=None):
+    """Seconds since kind was last refreshed, or None if it never was."""
+    refreshed_at = (state.get(kind) or {}).get("refreshed_at")
+    if not refreshed_at:
+        return None
+    refreshed = datetime.fromisoformat(refreshed_at.replace("Z", "+00:00"))
+    return ((now or datetime.now(timezone.utc)) - refreshed).total_seconds()
+
+
+def stale_kinds(state, kinds, max_ages=MAX_AGES):
+    stale = []
+    for kind in sorted(kinds):
+        seconds = age(state, kind)
+        if seconds is None or seconds > max_ages.get(kind, 0):
+            stale.append(kind)
+    return stale
+
+
+def mark_refreshed(ticker, kinds, error=None):
+    """Record a refresh of kinds for ticker; a failed one only records the attempt."""
+    mark_refreshed_many([ticker], kinds, {ticker: error} if error else None)
+
+
+def mark_refreshed_many(tickers, kinds, errors=None):
+    """Record a refresh of kinds for many tickers; errors maps the failed ones to a message."""
+    errors = errors or {}
+    now = datetime.now(timezone.utc).isoformat()
+    ok, failed = [], []
+    for ticker in tickers:
+        for kind in kinds:
+            row = {"ticker": ticker, "kind": kind, "attempted_at": now, "error": errors.get(ticker)}
+            if ticker in errors:
+                failed.append(row)
+            else:
+                ok.append({**row, "refreshed_at": now})
+    # Separate upserts: failed rows must not send refreshed_at, or they would clear it
+    for rows in (ok, failed):
+        if rows:
+            supabase.table("refresh_state").upsert(rows, on_conflict="ticker,kind").execute()
+
+
+def _metrics_for(kinds, metrics):
+    return [
+        m for m in metrics
+        if METRIC_GROUPS.get(m) in kinds or (m == "recommendations" and "recommendations" in kinds)
+    ]
+
+
+def refresh(ticker, company_name, kinds, metrics=()):
+    """Fetch kinds from upstream now and record the refresh; returns {kind: error}."""
+    from scripts.analysis_module import analyze_ticker
+    from scripts.euronews_module import push_news
+
+    errors = {}
+    jobs = []
+    fundamentals = [k for k in kinds if k in FUNDAMENTAL_KINDS]
+    if fundamentals:
+        jobs.append((fundamentals, lambda: analyze_ticker(ticker, _metrics_for(fundamentals, metrics))))
+    if "news" in kinds:
+        jobs.append((["news"], lambda: push_news(ticker, company_name)))
+    # Filings are kept current by the filing worker, which records its own refreshes
+
+    for job_kinds, job in jobs:
+        try:
+            job()
+            mark_refreshed(ticker, job_kinds)
+        except Exception as e:
+            errors.update({kind: str(e) for kind in job_kinds})
+            try:
+                mark_refreshed(ticker, job_kinds, error=str(e))
+            except Exception:
+                pass
+    with _lock:
+        _versions[ticker] = _versions.get(ticker, 0) + 1
+    return errors
+
+
+def _background_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="freshness")
+    return _pool
+
+
+def refresh_in_background(ticker, company_name, kinds, metrics=()):
+    """Queue a refresh of the kinds not already being refreshed; returns the queued kinds."""
+    with _lock:
+        queued = [k for k in kinds if (ticker, k) not in _inflight]
+        for kind in queued:
+            _inflight[(ticker, kind)] = True
+    if not queued:
+        return []
+
+    def run():
+        try:
+            refresh(ticker, company_name, queued, metrics)
+        finally:
+            with _lock:
+                for kind in queued:
+                    _inflight.pop((ticker, kind), None)
+
+    _background_pool().submit(bind(run))
+    return queued
+
+
+def ensure_fresh(ticker, company_name, kinds, metrics=(), blocking=()):
+    """Refresh the stale kinds of a ticker: those in blocking now, the rest in the background.
+
+    Returns {"state", "stale", "errors"} so callers can render stored data and
+    say what is being refreshed.
+    """
+    state = load_state(ticker)
+    stale = stale_kinds(state, kinds)
+    now = [k for k in stale if k in blocking]
+    errors = refresh(ticker, company_name, now, metrics) if now else {}
+    later = [k for k in stale if k not in blocking]
+    if later:
+        refresh_in_background(ticker, company_name, later, metrics)
+    return {"state": state, "stale": stale, "errors": errors}
+
+
+def refreshing(ticker):
+    """Kinds of ticker with a background refresh in flight."""
+    with _lock:
+        return sorted(kind for t, kind in _inflight if t == ticker)
+
+
+def version(ticker):
+    """Counter bumped after each refresh of ticker, for keying cached views."""
+    with _lock:
+        return _versions.get(ticker, 0)
+
+
+def describe_age(seconds):
+    if seconds is None:
+        return "never"
+    for unit, size in (("d", 86400), ("h", 3600), ("min", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)} {unit} ago"
+    return "just now"
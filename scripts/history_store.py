@@ -0,0 +1,146 @@
+import os
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Append-only Parquet history of every fundamentals refresh, partitioned by day
+HISTORY_PATH = Path(os.environ.get("HISTORY_PATH", ".cache/fundamentals_history"))
+
+# Absolute amounts keep float64; ratios fit in float32
+AMOUNT_FIELDS = [
+    "market_cap", "total_debt", "free_cash_flow", "operating_cash_flow",
+    "gross_profits", "ebitda",
+]
+RATIO_FIELDS = [
+    "trailing_pe", "forward_pe", "peg_ratio",
+    "profit_margins", "return_on_assets", "return_on_equity",
+    "revenue_growth", "earnings_growth", "quarterly_revenue_growth", "quarterly_earnings_growth",
+    "debt_to_equity", "current_ratio", "quick_ratio",
+    "dividend_rate", "dividend_yield", "payout_ratio",
+]
+METRIC_FIELDS = AMOUNT_FIELDS + RATIO_FIELDS
+
+SCHEMA = pa.schema(
+    [
+        ("ticker", pa.dictionary(pa.int32(), pa.string())),
+        ("as_of", pa.timestamp("ms", tz="UTC")),
+    ]
+    + [(f, pa.float64()) for f in AMOUNT_FIELDS]
+    + [(f, pa.float32()) for f in RATIO_FIELDS]
+)
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def append_snapshot(results, as_of=None):
+    """Append one row per ticker from analyze_ticker(s) results to today's partition."""
+    as_of = as_of or datetime.now(timezone.utc)
+    rows = []
+    for ticker, result in results.items():
+        row = {"ticker": ticker, "as_of": as_of}
+        for payload in result.values():
+            if isinstance(payload, dict):
+                row.update({f: _number(payload.get(f)) for f in METRIC_FIELDS if f in payload})
+        rows.append(row)
+    if not rows:
+        return None
+
+    table = pa.Table.from_pylist(rows, schema=SCHEMA)
+    partition = HISTORY_PATH / f"date={as_of.date().isoformat()}"
+    partition.mkdir(parents=True, exist_ok=True)
+    path = partition / f"part-{as_of:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+    pq.write_table(table, path, compression="zstd")
+    return path
+
+
+def _dataset():
+    return ds.dataset(
+        HISTORY_PATH,
+        format="parquet",
+        partitioning=PARTITIONING,
+        schema=SCHEMA.append(pa.field("date", pa.string())),
+    )
+
+
+def _read(filter_expr, columns=None):
+    if not HISTORY_PATH.exists():
+        return pd.DataFrame(columns=["ticker", "as_of"] + (columns or METRIC_FIELDS))
+    columns = ["ticker", "as_of"] + (columns or METRIC_FIELDS)
+    table = _dataset().to_table(columns=columns, filter=filter_expr)
+    return table.to_pandas()
+
+
+def as_of(when, tickers=None, columns=None):
+    """Latest known value of every metric per ticker as of a date (or datetime).
+
+    A column that a later refresh left empty keeps its last non-null value.
+    """
+    if isinstance(when, datetime):
+        cutoff = when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+    else:
+        when = when if isinstance(when, date) else date.fromisoformat(str(when))
+        cutoff = datetime(when.year, when.month, when.day, 23, 59, 59, 999000, tzinfo=timezone.utc)
+
+    expr = (ds.field("date") <= cutoff.date().isoformat()) & (
+        ds.field("as_of") <= pa.scalar(cutoff, pa.timestamp("ms", tz="UTC"))
+    )
+    if tickers:
+        expr = expr & ds.field("ticker").isin([t.upper() for t in tickers])
+    frame = _read(expr, columns)
+    if frame.empty:
+        return frame
+    frame["ticker"] = frame["ticker"].astype(str)
+    return frame.sort_values("as_of").groupby("ticker").last()
+
+
+def time_series(ticker, columns=None, start=None, end=None):
+    """Every recorded refresh of one ticker, oldest first, indexed by as_of."""
+    expr = ds.field("ticker") == ticker.upper()
+    if start:
+        expr = expr & (ds.field("date") >= str(start)[:10])
+    if end:
+        expr = expr & (ds.field("date") <= str(end)[:10])
+    frame = _read(expr, columns)
+    return frame.drop(columns="ticker").sort_values("as_of").set_index("as_of")
+
+
+def compact(day):
+    """Merge one day's small per-batch files into a single Parquet file."""
+    partition = HISTORY_PATH / f"date={str(day)[:10]}"
+    files = sorted(partition.glob("*.parquet"))
+    if len(files) < 2:
+        return None
+    table = pa.concat_tables(pq.read_table(f, schema=SCHEMA) for f in files)
+    # Sorted by ticker so row-group statistics let ticker filters skip data
+    keys = pa.table({"ticker": table["ticker"].cast(pa.string()), "as_of": table["as_of"]})
+    order = pc.sort_indices(keys, sort_keys=[("ticker", "ascending"), ("as_of", "ascending")])
+    path = partition / f"compacted-{uuid.uuid4().hex[:8]}.parquet"
+    pq.write_table(table.take(order), path, compression="zstd")
+    for f in files:
+        f.unlink()
+    return path
+
+
+def compact_before(day=None):
+    """Compact every partition older than day (default: today, UTC); returns the days compacted.
+
+    Today's partition is left alone: the app may still be appending to it.
+    """
+    day = str(day or datetime.now(timezone.utc).date())[:10]
+    compacted = []
+    for partition in sorted(HISTORY_PATH.glob("date=*")):
+        partition_day = partition.name.split("=", 1)[1]
+        if partition_day < day and compact(partition_day):
+            compacted.append(partition_day)
+    return compacted
@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+# Disk cache for yf.Ticker(...).info shared by every page and process on the host
+CACHE_PATH = Path(os.environ.get("INFO_CACHE_PATH", ".cache/yf_info.sqlite"))
+MAX_BYTES = int(os.environ.get("INFO_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Fields kept per group, with how long each group stays fresh (seconds)
+FIELD_GROUPS = {
+    "profile": [
+        "longName", "shortName", "sector", "industry", "country", "currency",
+    ],
+    "valuation": [
+        "marketCap", "trailingPE", "forwardPE", "pegRatio",
+    ],
+    "fundamentals": [
+        "profitMargins", "returnOnAssets", "returnOnEquity",
+        "revenueGrowth", "earningsGrowth", "quarterlyRevenueGrowth", "quarterlyEarningsGrowth",
+        "totalDebt", "debtToEquity", "currentRatio", "quickRatio",
+        "freeCashflow", "operatingCashflow", "grossProfits", "ebitda",
+        "dividendRate", "dividendYield", "payoutRatio",
+    ],
+}
+GROUP_TTLS = {
+    "profile": 7 * 24 * 60 * 60,
+    "valuation": 60 * 60,
+    "fundamentals": 24 * 60 * 60,
+}
+
+# Which groups each metric needs; the companies row always needs the profile
+METRIC_GROUPS = {
+    "valuation": "valuation",
+    "profitability": "fundamentals",
+    "growth": "fundamentals",
+    "balance": "fundamentals",
+    "cashflow": "fundamentals",
+    "dividends": "fundamentals",
+}
+
+
+def _connect():
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS info (
+            ticker TEXT NOT NULL,
+            field_group TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (ticker, field_group)
+        )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS info_last_access ON info (last_access)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+    )
+    return conn
+
+
+def groups_for(metrics):
+    """Return the field groups needed to build the given metrics"""
+    return {"profile"} | {METRIC_GROUPS[m] for m in metrics if m in METRIC_GROUPS}
+
+
+def _count(conn, name):
+    conn.execute(
+        "INSERT INTO stats (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+
+
+def get_info(ticker, groups, fetch):
+    """Return cached info for the groups, calling fetch(ticker) when any is stale"""
+    now = time.time()
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT field_group, payload, fetched_at FROM info "
+            f"WHERE ticker = ? AND field_group IN ({','.join('?' * len(groups))})",
+            (ticker, *groups),
+        ).fetchall()
+        fresh = {g: p for g, p, fetched in rows if now - fetched < GROUP_TTLS[g]}
+
+        if set(fresh) >= set(groups):
+            conn.execute(
+                f"UPDATE info SET last_access = ? WHERE ticker = ? "
+                f"AND field_group IN ({','.join('?' * len(groups))})",
+                (now, ticker, *groups),
+            )
+            _count(conn, "hits")
+            info = {}
+            for payload in fresh.values():
+                info.update(json.loads(payload))
+            return info
+
+        _count(conn, "misses")
+        info = fetch(ticker) or {}
+        put_info(ticker, info, conn=conn)
+        return info
+    finally:
+        conn.close()
+
+
+def put_info(ticker, info, conn=None):
+    """Store every field group of an info payload and evict down to the size cap"""
+    if not info:
+        return
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        now = time.time()
+        for group, fields in FIELD_GROUPS.items():
+            payload = json.dumps({f: info.get(f) for f in fields})
+            conn.execute(
+                "INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, group, payload, len(payload), now, now),
+            )
+        _evict(conn)
+    finally:
+        if own:
+            conn.close()
+
+
+def _evict(conn):
+    """Drop least recently used entries until the cache fits in MAX_BYTES"""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    excess = total - MAX_BYTES
+    freed = 0
+    victims = []
+    for ticker, group, size in conn.execute(
+        "SELECT ticker, field_group, size FROM info ORDER BY last_access"
+    ):
+        victims.append((ticker, group))
+        freed += size
+        if freed >= excess:
+            break
+    conn.executemany("DELETE FROM info WHERE ticker = ? AND field_group = ?", victims)
+    conn.execute(
+        "INSERT INTO stats (name, value) VALUES ('evictions', ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (len(victims),),
+    )
+
+
+def cache_stats():
+    """Return hit/miss/eviction counters and the current cache size"""
+    conn = _connect()
+    try:
+        stats = {"hits": 0, "misses": 0, "evictions": 0}
+        stats.update(dict(conn.execute("SELECT name, value FROM stats")))
+        entries, size = conn.execute(
+            "SELECT COUNT(DISTINCT ticker), COALESCE(SUM(size), 0) FROM info"
+        ).fetchone()
+        stats["tickers"] = entries
+        stats["bytes"] = size
+        return stats
+    finally:
+        conn.close()
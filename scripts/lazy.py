@@ -0,0 +1,34 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            # import_module holds the import system's per-module lock, so
+            # threads racing on first use all get the same module
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    """Return module name if it is already imported, otherwise a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
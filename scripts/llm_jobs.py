@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from supabase_client import supabase
+from scripts import freshness
+from scripts.config import setting
+from scripts.snapshot import METRIC_TABLES, load_company_snapshot
+
+# Identifies this process when it leases jobs
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+DEFAULT_MODEL_URL = "https://api-inference.huggingface.co/models/yiyanghkust/finbert-tone"
+# Seconds a job may run, inference included; a job past it fails itself
+TASK_TIMEOUT = 5 * 60
+# Well beyond TASK_TIMEOUT, so a job is only reclaimed once its worker is gone
+LEASE_SECONDS = 3 * TASK_TIMEOUT
+# A job is given up after this many workers died holding it
+MAX_ATTEMPTS = 3
+# Analyses scored at once in this process, however many workers claim jobs;
+# the upstream limiter also paces each request to the endpoint's host
+INFERENCE_CONCURRENCY = int(os.environ.get("LLM_INFERENCE_CONCURRENCY", 2))
+# Bookkeeping fields that change on every refresh without changing the input
+VOLATILE_FIELDS = ("id", "company_id", "created_at", "updated_at", "uniquekey")
+ACTIVE = ("queued", "running")
+
+_inference = threading.BoundedSemaphore(INFERENCE_CONCURRENCY)
+
+
+def model_url():
+    """Inference endpoint for analyses; point LLM_MODEL_URL at the stand-in server offline."""
+    return setting("LLM_MODEL_URL", DEFAULT_MODEL_URL)
+
+
+def fetch_metric_data(ticker):
+    """Collect all related metric tables for the given ticker in one query."""
+    snapshot = load_company_snapshot(ticker=ticker, news_limit=0)
+    if not snapshot:
+        return {}
+    return {table: snapshot.row(table) for table in METRIC_TABLES if snapshot.row(table)}
+
+
+def metrics_to_text(collected_data):
+    """Flatten metric rows into one sentence per table so they can be chunked."""
+    sentences = []
+    for table, row in collected_data.items():
+        fields = ", ".join(
+            f"{k.replace('_', ' ')} {v}" for k, v in row.items() if k not in VOLATILE_FIELDS and v is not None
+        )
+        sentences.append(f"{table.title()}: {fields}.")
+    return "\n".join(sentences)
+
+
+def input_hash(model, ticker, collected_data):
+    """Hash of everything an analysis depends on: the model, the ticker and the metric values."""
+    data = {
+        table: {k: v for k, v in row.items() if k not in VOLATILE_FIELDS}
+        for table, row in collected_data.items()
+    }
+    payload = json.dumps([model, ticker, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def find_analysis(key):
+    """The stored analysis for an input hash, or None."""
+    res = (
+        supabase.table("llm_analysis")
+        .select("ticker, analysis_result, created_at")
+        .eq("input_hash", key)
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return (res.data or [None])[0]
+
+
+def _time_left(deadline):
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("Analysis ran out of time.")
+    return left
+
+
+def run_analysis(ticker, collected_data, model, timeout=TASK_TIMEOUT):
+    """Score the metric data with the model within timeout seconds and render the analysis markdown."""
+    from scripts.finbert_module import format_long_text_result, score_long_text
+
+    deadline = time.monotonic() + timeout
+    if not _inference.acquire(timeout=timeout):
+        raise TimeoutError(f"No inference slot free within {timeout:.0f}s.")
+    try:
+        # The metric data is split into windows FinBERT can read and scored concurrently
+        result = score_long_text(
+            metrics_to_text(collected_data), api_url=model, timeout=_time_left(deadline)
+        )
+    finally:
+        _inference.release()
+    if not result:
+        raise ValueError("No analysis returned.")
+    return (
+        f"#### Fundamental tone for {ticker}\n\n"
+        f"{format_long_text_result(result)}\n\n"
+        "_This is not financial advice._"
+    )
+
+
+def _fundamental_kinds():
+    return freshness.kinds_for(METRIC_TABLES)
+
+
+def _memoized(ticker, model):
+    """A stored analysis of the current metric data, if that data is fresh."""
+    state = freshness.load_state(ticker)
+    if freshness.stale_kinds(state, _fundamental_kinds()):
+        return None
+    data = fetch_metric_data(ticker)
+    return find_analysis(input_hash(model, ticker, data)) if data else None
+
+
+def submit(ticker, model=None):
+    """Queue an analysis of ticker and return its job.
+
+    If the fundamentals are fresh and an analysis of exactly this data exists,
+    a finished job carrying it is returned without queueing anything. A
+    ticker that already has a live job shares it.
+    """
+    ticker = ticker.strip().upper()
+    model = model or model_url()
+    memo = _memoized(ticker, model)
+    if memo:
+        return {
+            "id": None,
+            "ticker": ticker,
+            "model": model,
+            "status": "done",
+            "result": memo["analysis_result"],
+            "created_at": memo["created_at"],
+            "cached": True,
+        }
+
+    active = _active_job(ticker, model)
+    if active:
+        return active
+    try:
+        res = supabase.table("llm_jobs").insert({"ticker": ticker, "model": model, "status": "queued"}).execute()
+        return res.data[0]
+    except Exception:
+        # Another session queued the same analysis first (llm_jobs_active)
+        active = _active_job(ticker, model)
+        if active:
+            return active
+        raise
+
+
+def _active_job(ticker, model):
+    res = (
+        supabase.table("llm_jobs")
+        .select("*")
+        .eq("ticker", ticker)
+        .eq("model", model)
+        .in_("status", list(ACTIVE))
+        .limit(1)
+        .execute()
+    )
+    return (res.data or [None])[0]
+
+
+def get_job(job_id):
+    res = supabase.table("llm_jobs").select("*").eq("id", job_id).limit(1).execute()
+    return (res.data or [None])[0]
+
+
+def claim_jobs(limit, worker_id=WORKER_ID, lease_seconds=LEASE_SECONDS):
+    """Lease up to `limit` queued jobs for this worker; other workers skip them."""
+    res = supabase.rpc(
+        "claim_llm_jobs",
+        {"p_worker": worker_id, "p_limit": limit, "p_lease_seconds": lease_seconds, "p_max_attempts": MAX_ATTEMPTS},
+    ).execute()
+    return res.data or []
+
+
+def _finish(job, **fields):
+    supabase.table("llm_jobs").update({
+        **fields,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", job["id"]).eq("lease_owner", job["lease_owner"]).execute()
+
+
+def process_job(job, timeout=TASK_TIMEOUT):
+    """Refresh stale fundamentals, then reuse or run the analysis and store it, within timeout seconds."""
+    deadline = time.monotonic() + timeout
+    ticker, model = job["ticker"], job["model"]
+    kinds = _fundamental_kinds()
+    freshness.ensure_fresh(ticker, ticker, kinds, METRIC_TABLES, blocking=kinds)
+
+    data = fetch_metric_data(ticker)
+    if not data:
+        raise ValueError(f"No metrics found for ticker '{ticker}' in Supabase.")
+    key = input_hash(model, ticker, data)
+    memo = find_analysis(key)
+    if memo:
+        result = memo["analysis_result"]
+    else:
+        result = run_analysis(ticker, data, model, timeout=_time_left(deadline))
+        supabase.table("llm_analysis").insert({
+            "ticker": ticker,
+            "analysis_result": result,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "model": model,
+            "input_hash": key,
+        }).execute()
+    _finish(job, status="done", result=result, input_hash=key, error=None)
+
+
+def process_queued_jobs(max_workers=2, task_timeout=TASK_TIMEOUT):
+    """Claim queued jobs, run them concurrently and return (processed, failed)."""
+    jobs = claim_jobs(max_workers, lease_seconds=max(LEASE_SECONDS, 3 * task_timeout))
+    if not jobs:
+        return 0, 0
+
+    # Every job gives up at its own deadline, so the round waits for all of
+    # them and no thread outlives it holding an inference slot
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(process_job, job, task_timeout): job for job in jobs}
+
+    processed = 0
+    for future in futures:
+        error = future.exception()
+        if error is None:
+            processed += 1
+        else:
+            # Upstream calls are already retried, so a failure is reported rather than requeued
+            _finish(futures[future], status="failed", error=str(error)[:500])
+
+    return processed, len(jobs) - processed
@@ -0,0 +1,54 @@
+import logging
+import threading
+from scripts.llm_jobs import WORKER_ID, process_queued_jobs
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls of the analysis queue; a person is waiting on these jobs
+POLL_INTERVAL = 2
+JOB = "llm"
+MAX_WORKERS = 2
+
+
+def run_once(max_workers=MAX_WORKERS):
+    """Process one round of queued analyses and record the run."""
+    error = None
+    try:
+        processed, failed = process_queued_jobs(max_workers=max_workers)
+    except Exception as e:
+        logger.exception("LLM worker round failed")
+        processed, failed, error = 0, 1, f"{type(e).__name__}: {e}"
+    # Idle polls come every few seconds and are not worth a write each
+    if processed or failed:
+        # Shares the dashboard's worker_runs table; imported here to keep the page import light
+        from scripts.filing_worker import record_run
+
+        record_run(processed, failed, job=JOB, error=error)
+    return processed
+
+
+def run_forever(max_workers=MAX_WORKERS, poll_interval=POLL_INTERVAL, stop_event=None):
+    """Poll the queue until stopped; rounds that fill every slot poll again immediately."""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        processed = run_once(max_workers)
+        if processed < max_workers:
+            stop_event.wait(poll_interval)
+
+
+def start_background_worker(max_workers=MAX_WORKERS, poll_interval=POLL_INTERVAL):
+    """Start the worker loop in a daemon thread and return its stop event."""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_forever,
+        args=(max_workers, poll_interval, stop_event),
+        name="llm-worker",
+        daemon=True,
+    )
+    thread.start()
+    return stop_event
+
+
+if __name__ == "__main__":
+    print(f"LLM worker {WORKER_ID} polling every {POLL_INTERVAL}s")
+    run_forever()
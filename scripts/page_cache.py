@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from scripts.upstream import CircuitOpenError, classify
+
+# Compressed disk cache for downloaded article HTML and the text extracted from it
+CACHE_PATH = Path(os.environ.get("PAGE_CACHE_PATH", ".cache/pages.sqlite"))
+MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Seconds a downloaded page, or a failed download, is reused
+HTML_TTL = 7 * 24 * 60 * 60
+FAILURE_TTL = 60 * 60
+
+
+def _connect():
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # html: keyed by URL; body is NULL for a negative (failed) entry
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS html (
+            url_hash TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            body BLOB,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )"""
+    )
+    # text: keyed by a hash of the HTML it was extracted from
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS text (
+            content_hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS html_last_access ON html (last_access)")
+    conn.execute("CREATE INDEX IF NOT EXISTS text_last_access ON text (last_access)")
+    return conn
+
+
+def _hash(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def fetch_html(url, download):
+    """Return the HTML for a URL, calling download(url) only on a cache miss.
+
+    Returns None while a recent download of the URL is known to have failed.
+    """
+    key = _hash(url)
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT body, fetched_at FROM html WHERE url_hash = ?", (key,)
+        ).fetchone()
+        if row:
+            body, fetched_at = row
+            ttl = HTML_TTL if body is not None else FAILURE_TTL
+            if now - fetched_at < ttl:
+                conn.execute("UPDATE html SET last_access = ? WHERE url_hash = ?", (now, key))
+                return zlib.decompress(body).decode("utf-8") if body is not None else None
+
+        try:
+            html = download(url)
+        except Exception as e:
+            # Throttling and outages say nothing about the page, so they are not remembered
+            if isinstance(e, CircuitOpenError) or classify(e) != "permanent":
+                raise
+            html = None
+        body = zlib.compress(html.encode("utf-8")) if html else None
+        conn.execute(
+            "INSERT OR REPLACE INTO html VALUES (?, ?, ?, ?, ?, ?)",
+            (key, url, body, len(body) if body else 0, now, now),
+        )
+        _evict(conn)
+        return html or None
+    finally:
+        conn.close()
+
+
+def get_text(html):
+    """Return previously extracted text for this HTML, or None"""
+    key = _hash(html)
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT body FROM text WHERE content_hash = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE text SET last_access = ? WHERE content_hash = ?", (time.time(), key))
+        return zlib.decompress(row[0]).decode("utf-8")
+    finally:
+        conn.close()
+
+
+def put_text(html, text):
+    """Store the text extracted from this HTML"""
+    body = zlib.compress(text.encode("utf-8"))
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO text VALUES (?, ?, ?, ?)",
+            (_hash(html), body, len(body), time.time()),
+        )
+        _evict(conn)
+    finally:
+        conn.close()
+
+
+def _evict(conn):
+    """Drop least recently used pages and texts until the cache fits in MAX_BYTES"""
+    total = conn.execute(
+        "SELECT (SELECT COALESCE(SUM(size), 0) FROM html) + (SELECT COALESCE(SUM(size), 0) FROM text)"
+    ).fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    excess = total - MAX_BYTES
+    for table, key_column, key, size, _ in conn.execute(
+        "SELECT 'html', 'url_hash', url_hash, size, last_access FROM html "
+        "UNION ALL SELECT 'text', 'content_hash', content_hash, size, last_access FROM text "
+        "ORDER BY last_access"
+    ).fetchall():
+        conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+        excess -= max(size, 1)
+        if excess <= 0:
+            break
+
+
+def cache_stats():
+    """Return entry counts and sizes for the page cache"""
+    conn = _connect()
+    try:
+        pages, failed, html_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(body IS NULL), 0), COALESCE(SUM(size), 0) FROM html"
+        ).fetchone()
+        texts, text_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM text"
+        ).fetchone()
+        return {
+            "pages": pages,
+            "failed": failed,
+            "texts": texts,
+            "bytes": html_bytes + text_bytes,
+        }
+    finally:
+        conn.close()
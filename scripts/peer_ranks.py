@@ -0,0 +1,154 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from supabase_client import supabase
+from scripts.db_writer import upsert_records
+from scripts.screener import _fetch_all, load_frame, numeric_columns
+
+GROUP_TYPES = ["sector", "industry"]
+# Seconds refreshed companies are collected before their groups are recomputed together
+DEBOUNCE_SECONDS = 5
+# Ids per delete request, to keep the filter within URL limits
+ID_CHUNK = 200
+
+_pending = set()
+_timer = None
+_lock = threading.Lock()
+
+
+def compute_ranks(frame, group_types=GROUP_TYPES):
+    """Percentile and z-score of every numeric metric within each peer group, as rank rows."""
+    metrics = numeric_columns(frame)
+    rows = []
+    for group_type in group_types:
+        peers = frame[frame[group_type].notna()]
+        if peers.empty or not metrics:
+            continue
+        grouped = peers.groupby(group_type)[metrics]
+        percentile = grouped.rank(pct=True)
+        mean = grouped.transform("mean")
+        std = grouped.transform("std").replace(0, np.nan)
+        zscore = (peers[metrics] - mean) / std
+        count = grouped.transform("count")
+
+        # Long format: one row per (company, metric) with a value
+        long = pd.concat(
+            {
+                "value": peers[metrics].stack(),
+                "percentile": percentile.stack(),
+                "zscore": zscore.stack(),
+                "peer_count": count.stack(),
+            },
+            axis=1,
+        ).dropna(subset=["value"])
+        long.index.names = ["company_id", "metric"]
+        long = long.reset_index()
+        long["group_type"] = group_type
+        long["group_value"] = peers.loc[long["company_id"], group_type].to_numpy()
+        rows.append(long)
+
+    if not rows:
+        return []
+    ranks = pd.concat(rows, ignore_index=True)
+    ranks["uniquekey"] = (
+        ranks["company_id"].astype(str) + "_" + ranks["group_type"] + "_" + ranks["metric"]
+    )
+    ranks["peer_count"] = ranks["peer_count"].astype(int)
+    ranks = ranks.astype(object).where(ranks.notna(), None)
+    return ranks.to_dict("records")
+
+
+def save_ranks(rows, generation):
+    """Upsert rank rows stamped with generation; older rows of the same groups are removed after."""
+    for row in rows:
+        row["generation"] = generation
+    return upsert_records("peer_ranks", "uniquekey", rows)
+
+
+def _delete_older(generation, group_type=None, groups=None, company_ids=None):
+    # Rows a recomputation no longer produces: a company that left the group or
+    # whose metric became null. Newer generations from a concurrent run survive.
+    if company_ids:
+        for start in range(0, len(company_ids), ID_CHUNK):
+            (
+                supabase.table("peer_ranks").delete()
+                .lt("generation", generation)
+                .in_("company_id", company_ids[start:start + ID_CHUNK])
+                .execute()
+            )
+        return
+    query = supabase.table("peer_ranks").delete().lt("generation", generation)
+    if group_type:
+        query = query.eq("group_type", group_type).in_("group_value", groups)
+    query.execute()
+
+
+def refresh_all_ranks():
+    """Recompute ranks for the whole universe."""
+    generation = time.time_ns()
+    rows = compute_ranks(load_frame())
+    save_ranks(rows, generation)
+    _delete_older(generation)
+    return len(rows)
+
+
+def refresh_peer_groups(company_ids):
+    """Recompute ranks only for the sectors and industries these companies belong to.
+
+    Industries sit inside a sector, so one frame of the companies' sectors
+    covers both kinds of group.
+    """
+    company_ids = sorted({c for c in company_ids if c is not None})
+    if not company_ids:
+        return 0
+    generation = time.time_ns()
+    companies = _fetch_all("companies", "id, sector", "id", company_ids)
+    sectors = sorted({c["sector"] for c in companies if c.get("sector")})
+    frame = load_frame(sectors=sectors) if sectors else None
+
+    total = 0
+    if frame is not None and not frame.empty:
+        rows = compute_ranks(frame)
+        save_ranks(rows, generation)
+        total = len(rows)
+        for group_type in GROUP_TYPES:
+            groups = sorted(frame[group_type].dropna().unique())
+            if groups:
+                _delete_older(generation, group_type, groups)
+    # The refreshed companies' rows from groups they have since left
+    _delete_older(generation, company_ids=company_ids)
+    return total
+
+
+def _flush():
+    global _timer
+    with _lock:
+        company_ids = list(_pending)
+        _pending.clear()
+        _timer = None
+    try:
+        refresh_peer_groups(company_ids)
+    except Exception:
+        # Ranks are derived data; the next refresh of the group recomputes them
+        pass
+
+
+def schedule_refresh(company_ids):
+    """Recompute these companies' groups in the background, batched with others refreshed meanwhile."""
+    global _timer
+    with _lock:
+        _pending.update(c for c in company_ids if c is not None)
+        if _timer is None and _pending:
+            _timer = threading.Timer(DEBOUNCE_SECONDS, _flush)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush_scheduled():
+    """Recompute any scheduled groups now, e.g. before a headless run exits."""
+    with _lock:
+        timer = _timer
+    if timer is not None:
+        timer.cancel()
+        _flush()
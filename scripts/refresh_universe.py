@@ -0,0 +1,293 @@
+"""Refresh fundamentals, news and filings without a Streamlit server.
+
+    python -m scripts.refresh_universe --tickers AAPL MSFT NOKIA.HE
+    python -m scripts.refresh_universe --all --workers 16 --config /etc/fundamentals.toml
+    python -m scripts.refresh_universe --all --kinds news --restart
+
+Settings come from the environment or a TOML file (--config, or APP_CONFIG)
+with the same keys as .streamlit/secrets.toml. Every finished batch is
+appended to a checkpoint file, so an interrupted run started again with the
+same arguments skips the tickers already done, and a run that had failures
+retries just those. The checkpoint is removed once a run completes without
+failures. The filings kind drains the shared due-filings queue, which is not
+limited to the given tickers. Runs that refresh fundamentals also compact the
+history files of previous days.
+"""
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from scripts import config
+
+KINDS = ["fundamentals", "news", "filings"]
+METRICS = [
+    "valuation",
+    "profitability",
+    "growth",
+    "balance",
+    "cashflow",
+    "dividends",
+    "recommendations",
+]
+CHECKPOINT_DIR = Path(os.environ.get("REFRESH_CHECKPOINT_DIR", ".cache/refresh"))
+BATCH_SIZE = 200
+WORKERS = 8
+FILING_WORKERS = 4
+# Companies read from the table per request
+PAGE_SIZE = 1000
+
+
+def load_universe():
+    """(ticker, company_name) for every company, in ticker order."""
+    from supabase_client import supabase
+
+    pairs, last = [], None
+    while True:
+        query = supabase.table("companies").select("ticker, company_name").order("ticker").limit(PAGE_SIZE)
+        if last is not None:
+            query = query.gt("ticker", last)
+        page = query.execute().data or []
+        pairs.extend((row["ticker"], row.get("company_name") or row["ticker"]) for row in page if row.get("ticker"))
+        if len(page) < PAGE_SIZE:
+            return pairs
+        last = page[-1]["ticker"]
+
+
+def company_names(tickers):
+    """{ticker: company_name} from the companies table; unknown tickers map to themselves."""
+    from supabase_client import supabase
+
+    names = {}
+    for start in range(0, len(tickers), PAGE_SIZE):
+        chunk = tickers[start:start + PAGE_SIZE]
+        rows = supabase.table("companies").select("ticker, company_name").in_("ticker", chunk).execute().data or []
+        names.update((row["ticker"], row.get("company_name")) for row in rows)
+    return {t: names.get(t) or t for t in tickers}
+
+
+class Checkpoint:
+    """Append-only record of finished (kind, ticker) pairs for one set of arguments."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write leaves a partial last line
+                        continue
+                    key = (entry["kind"], entry["ticker"])
+                    if entry.get("error"):
+                        self.done.discard(key)
+                    else:
+                        self.done.add(key)
+
+    def pending(self, kind, tickers):
+        return [t for t in tickers if (kind, t) not in self.done]
+
+    def record(self, kind, tickers, errors):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        now = datetime.now(timezone.utc).isoformat()
+        with open(self.path, "a", encoding="utf-8") as f:
+            for ticker in tickers:
+                error = errors.get(ticker)
+                f.write(json.dumps({"kind": kind, "ticker": ticker, "error": error, "at": now}) + "\n")
+                if not error:
+                    self.done.add((kind, ticker))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+
+def checkpoint_path(args):
+    """Checkpoint file named after the arguments that decide what a run covers."""
+    spec = {
+        "tickers": "all" if args.all else sorted(args.tickers),
+        "kinds": sorted(args.kinds),
+        "metrics": sorted(args.metrics),
+    }
+    key = hashlib.sha1(json.dumps(spec).encode("utf-8")).hexdigest()[:12]
+    return CHECKPOINT_DIR / f"{key}.jsonl"
+
+
+class Progress:
+    """One status line per batch on stderr: done/total, errors, rate and time left."""
+
+    def __init__(self, kind, total, skipped):
+        self.kind, self.total, self.done, self.errors = kind, total, skipped, 0
+        self.skipped = skipped
+        self.started = time.monotonic()
+        if skipped:
+            self._print(f"resuming, {skipped} already done")
+
+    def _print(self, message):
+        print(f"[{self.kind}] {message}", file=sys.stderr, flush=True)
+
+    def advance(self, count, errors):
+        self.done += count
+        self.errors += errors
+        elapsed = time.monotonic() - self.started
+        rate = (self.done - self.skipped) / elapsed if elapsed else 0.0
+        left = (self.total - self.done) / rate if rate else 0.0
+        self._print(
+            f"{self.done}/{self.total} ({self.done / self.total:.0%})  errors {self.errors}  "
+            f"{rate:.1f}/s  eta {int(left // 60)}m{int(left % 60):02d}s"
+        )
+
+
+def refresh_fundamentals(batch, metrics, workers):
+    from scripts.analysis_module import analyze_tickers
+    from scripts.freshness import kinds_for, mark_refreshed_many
+
+    outcome = analyze_tickers(batch, metrics, max_workers=workers, batch_size=len(batch))
+    errors = {t: outcome["errors"].get(t) or "no result" for t in batch if t not in outcome["results"]}
+    mark_refreshed_many(batch, kinds_for(metrics), errors)
+    return errors
+
+
+def refresh_news(batch, names, workers):
+    from scripts.euronews_module import push_news
+    from scripts.freshness import mark_refreshed_many
+    from scripts.tracing import bind
+
+    def push(ticker):
+        try:
+            push_news(ticker, names[ticker])
+        except Exception as e:
+            return ticker, str(e)
+        return ticker, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = {t: e for t, e in pool.map(bind(push), batch) if e}
+    mark_refreshed_many(batch, ["news"], errors)
+    return errors
+
+
+def drain_filings(workers):
+    """Process due filings until the queue is empty; returns (processed, failed)."""
+    from scripts.filing_worker import record_run
+    from scripts.filings import process_due_filings
+
+    processed = failed = 0
+    while True:
+        # Failed filings go back with one more attempt, so the queue runs dry
+        done, errors = process_due_filings(max_workers=workers)
+        processed, failed = processed + done, failed + errors
+        print(f"[filings] {processed} processed, {failed} failed", file=sys.stderr, flush=True)
+        if not done and not errors:
+            break
+    record_run(processed, failed)
+    return processed, failed
+
+
+def compact_history():
+    """Merge the per-batch history files of finished days; a failure is reported, not fatal."""
+    try:
+        from scripts.history_store import compact_before
+
+        days = compact_before()
+    except Exception as e:
+        print(f"[history] compaction failed: {e}", file=sys.stderr, flush=True)
+        return
+    if days:
+        print(f"[history] compacted {len(days)} day(s)", file=sys.stderr, flush=True)
+
+
+def run(args):
+    """Refresh every requested kind; returns {kind: {ticker: error}}."""
+    if args.all:
+        pairs = load_universe()
+        tickers, names = [t for t, _ in pairs], dict(pairs)
+    else:
+        tickers = list(dict.fromkeys(t.strip().upper() for t in args.tickers if t.strip()))
+        names = None
+
+    checkpoint = Checkpoint(args.checkpoint or checkpoint_path(args))
+    if args.restart:
+        checkpoint.remove()
+        checkpoint = Checkpoint(checkpoint.path)
+
+    failures = {}
+    for kind in [k for k in KINDS if k in args.kinds]:
+        if kind == "filings":
+            processed, failed = drain_filings(args.filing_workers)
+            if failed:
+                failures["filings"] = {"queue": f"{failed} filing(s) failed"}
+            continue
+
+        pending = checkpoint.pending(kind, tickers)
+        progress = Progress(kind, len(tickers), len(tickers) - len(pending))
+        if kind == "news" and names is None:
+            # Looked up after fundamentals so companies created by this run have names
+            names = company_names(pending)
+        errors = {}
+        for start in range(0, len(pending), args.batch_size):
+            batch = pending[start:start + args.batch_size]
+            if kind == "fundamentals":
+                batch_errors = refresh_fundamentals(batch, args.metrics, args.workers)
+            else:
+                batch_errors = refresh_news(batch, names, args.workers)
+            checkpoint.record(kind, batch, batch_errors)
+            errors.update(batch_errors)
+            progress.advance(len(batch), len(batch_errors))
+        if errors:
+            failures[kind] = errors
+
+    if "fundamentals" in args.kinds:
+        compact_history()
+    # A failed ticker is retried by running the same command again
+    if not failures:
+        checkpoint.remove()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh fundamentals, news and filings headlessly")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--tickers", nargs="+", help="tickers to refresh")
+    target.add_argument("--all", action="store_true", help="every ticker in the companies table")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=KINDS)
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=METRICS)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent tickers per batch")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="tickers per checkpointed batch")
+    parser.add_argument("--filing-workers", type=int, default=FILING_WORKERS)
+    parser.add_argument("--config", type=Path, help="TOML settings file (default: $APP_CONFIG)")
+    parser.add_argument("--checkpoint", type=Path, help="checkpoint file (default: derived from the arguments)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if args.config:
+        config.load(args.config)
+    # Let cron's SIGTERM unwind like Ctrl-C; finished batches are already checkpointed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    try:
+        failures = run(args)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+
+    from scripts.upstream import stats
+
+    for name, counts in stats().items():
+        print(f"{name}: {json.dumps(counts)}", file=sys.stderr)
+    for kind, errors in failures.items():
+        print(f"{kind}: {len(errors)} failed", file=sys.stderr)
+        for ticker, error in list(errors.items())[:20]:
+            print(f"  {ticker}: {error}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
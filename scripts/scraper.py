@@ -1,14 +1,39 @@
-import feedparser
-from newspaper import Article
-import trafilatura
 import datetime
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scripts.page_cache import fetch_html, get_text, put_text
+from scripts.dedup import dedupe
+from scripts.feed_cache import get_feed
+from scripts.lazy import lazy_import
+from scripts.tracing import bind, host, span
+from scripts.upstream import call
+
+# Heavy parsers are imported when the first article is fetched
+newspaper = lazy_import("newspaper")
+trafilatura = lazy_import("trafilatura")
+
+# How many feed candidates are extracted in parallel, and how long each may take
+CANDIDATES = 5
+EXTRACT_TIMEOUT = 45
+# Extraction processes running at once across all callers (e.g. concurrent filings)
+EXTRACT_PROCESSES = CANDIDATES
+FILING_KEYWORDS = [
+    "earnings", "results", "revenue", "quarter", "annual", "report",
+    "filing", "guidance", "profit", "dividend", "eps", "outlook",
+]
+
+_context = None
+_context_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(EXTRACT_PROCESSES)
 
 
 def fetch_recent_filings_from_news(company_name):
     """Fetch most recent filings or financial report news articles."""
     query = f"{company_name} financial report OR earnings OR results OR filing"
     rss_url = f"https://news.google.com/rss/search?q={query.replace(' ', '+')}"
-    feed = feedparser.parse(rss_url)
+    feed = get_feed(rss_url)
     articles = []
     for entry in feed.entries[:10]:
         articles.append({
@@ -17,45 +42,162 @@ def fetch_recent_filings_from_news(company_name):
             "link": entry.link,
             "published": entry.get("published", ""),
         })
-    return articles
+    # Syndicated copies of one story would otherwise fill the extraction candidates
+    return dedupe(articles)
+
+
+def _download(url):
+    """Download a page with trafilatura, falling back to newspaper3k."""
+    with span("article.download", host=host(url)) as tags:
+        def fetch():
+            try:
+                downloaded = trafilatura.fetch_url(url, timeout=15)
+                if downloaded:
+                    return downloaded
+            except Exception:
+                pass
+
+            tags["fallback"] = "newspaper"
+            article = newspaper.Article(url)
+            article.download()
+            return article.html or None
+
+        return call(host(url), fetch)
 
 
 def extract_full_text(url):
-    """Hybrid extractor using trafilatura and newspaper3k."""
+    """Hybrid extractor using trafilatura and newspaper3k, backed by the page cache."""
+    html = fetch_html(url, _download)
+    if not html:
+        return ""
+
+    cached = get_text(html)
+    if cached is not None:
+        return cached
+
     text = ""
+    errors = []
     try:
-        downloaded = trafilatura.fetch_url(url, timeout=15)
-        if downloaded:
-            text = trafilatura.extract(downloaded)
-    except Exception:
-        pass
+        text = trafilatura.extract(html)
+    except Exception as e:
+        errors.append(f"trafilatura: {e}")
 
     if not text:
         try:
-            article = Article(url)
-            article.download()
+            article = newspaper.Article(url)
+            article.download(input_html=html)
             article.parse()
             text = article.text
-        except Exception:
-            pass
+        except Exception as e:
+            errors.append(f"newspaper: {e}")
+
+    text = text.strip() if text else ""
+    if not text and errors:
+        # Don't cache a failed extraction as the page's text
+        raise ValueError(f"Could not extract {url}: {'; '.join(errors)}")
+    put_text(html, text)
+    return text
+
+
+def _process_context():
+    """Fork server for extraction processes: cheap to start, and server threads are never forked."""
+    global _context
+    with _context_lock:
+        if _context is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                _context = multiprocessing.get_context("forkserver")
+                _context.set_forkserver_preload(["scripts.scraper"])
+            else:
+                _context = multiprocessing.get_context("spawn")
+    return _context
+
+
+def _extract_in_child(url, conn):
+    try:
+        conn.send((True, extract_full_text(url)))
+    except Exception as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def extract_isolated(url, timeout=EXTRACT_TIMEOUT):
+    """Run extract_full_text(url) in its own process and kill it if it runs past timeout.
+
+    At most EXTRACT_PROCESSES run at once; the deadline starts when this
+    extraction's process does, not when it was queued.
+    """
+    context = _process_context()
+    with _slots:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_extract_in_child, args=(url, sender), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(timeout):
+                raise TimeoutError(f"Extracting {url} took longer than {timeout}s")
+            ok, value = receiver.recv()
+        except EOFError:
+            raise RuntimeError(f"Extraction process for {url} died") from None
+        finally:
+            if process.is_alive():
+                process.kill()
+            process.join()
+            receiver.close()
+    if not ok:
+        raise RuntimeError(value)
+    return value
+
+
+def score_candidate(article, text):
+    """Rank extracted text by length and filing keyword relevance."""
+    if not text:
+        return 0.0
+    body = text.lower()
+    title = f"{article.get('title', '')} {article.get('summary', '')}".lower()
+    body_hits = sum(body.count(k) for k in FILING_KEYWORDS)
+    title_hits = sum(k in title for k in FILING_KEYWORDS)
+    return math.log1p(len(text)) + 2 * title_hits + min(body_hits, 50) / 10
+
+
+def extract_candidates(articles, top_n=CANDIDATES, timeout=EXTRACT_TIMEOUT):
+    """Download and extract the top articles in parallel, best match first.
+
+    Each candidate runs in a killable process with its own timeout, so a hung
+    download or parser never holds an extraction slot past its deadline.
+    """
+    candidates = articles[:top_n]
+    if not candidates:
+        return []
+    # Downloads run in child processes, so the parent times the whole fan-out
+    with span("article.extract_candidates", candidates=len(candidates)):
+        with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+            futures = {pool.submit(bind(extract_isolated), a["link"], timeout): a for a in candidates}
 
-    return text.strip() if text else ""
+    ranked = []
+    for future, article in futures.items():
+        if future.exception() is not None:
+            continue
+        text = future.result()
+        ranked.append({**article, "text": text, "score": score_candidate(article, text)})
+    ranked.sort(key=lambda c: c["score"], reverse=True)
+    return ranked
 
 
 def find_and_extract_latest_filing(company_name):
-    """Find the latest news related to the company's financial filing."""
+    """Find the news article that best matches the company's latest financial filing."""
     articles = fetch_recent_filings_from_news(company_name)
     if not articles:
         return None
 
-    # Get the most relevant article (latest)
-    latest = articles[0]
-    full_text = extract_full_text(latest["link"])
+    ranked = extract_candidates(articles)
+    # Fall back to the latest article when nothing could be extracted
+    best = ranked[0] if ranked and ranked[0]["score"] > 0 else {**articles[0], "text": ""}
 
     return {
-        "filing_url": latest["link"],
-        "filing_title": latest["title"],
-        "filing_summary": latest.get("summary", ""),
-        "filing_text": full_text,
+        "filing_url": best["link"],
+        "filing_title": best["title"],
+        "filing_summary": best.get("summary", ""),
+        "filing_text": best["text"],
         "fetched_from": "google_news",
     }
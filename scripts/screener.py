@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+import pandas as pd
+from supabase_client import supabase
+
+METRIC_TABLES = ["valuation", "profitability", "growth", "balance", "cashflow", "dividends"]
+COMPANY_COLUMNS = ["id", "ticker", "company_name", "sector", "industry", "country", "currency"]
+SKIP_COLUMNS = {"id", "company_id", "uniquekey", "created_at", "updated_at"}
+PAGE_SIZE = 1000
+# Seconds between checks of whether the underlying tables changed
+CHECK_INTERVAL = 60
+
+_cache = {"fingerprint": None, "frame": None, "checked_at": 0.0}
+_lock = threading.Lock()
+
+
+def _fetch_all(table, columns="*", column=None, values=None):
+    """Fetch every row of a table, optionally only rows whose column is in values."""
+    if values is not None:
+        values = list(values)
+        return [
+            row
+            for start in range(0, len(values), PAGE_SIZE // 5)
+            for row in _fetch_all_pages(table, columns, column, values[start:start + PAGE_SIZE // 5])
+        ]
+    return _fetch_all_pages(table, columns)
+
+
+def _fetch_all_pages(table, columns, column=None, values=None):
+    rows, start = [], 0
+    while True:
+        query = supabase.table(table).select(columns)
+        if column:
+            query = query.in_(column, values)
+        page = query.order("id").range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def load_frame(company_ids=None, sectors=None):
+    """Load companies and every metric table into one wide frame indexed by company_id.
+
+    With company_ids, only those companies are loaded; with sectors, only the
+    companies in those sectors.
+    """
+    if sectors is not None:
+        companies = _fetch_all("companies", ", ".join(COMPANY_COLUMNS), "sector", sectors)
+        company_ids = [c["id"] for c in companies]
+    else:
+        companies = _fetch_all("companies", ", ".join(COMPANY_COLUMNS), "id", company_ids)
+    frame = pd.DataFrame(companies, columns=COMPANY_COLUMNS)
+    frame = frame.rename(columns={"id": "company_id"}).set_index("company_id")
+    for table in METRIC_TABLES:
+        rows = pd.DataFrame(_fetch_all(table, "*", "company_id", company_ids))
+        if rows.empty:
+            continue
+        metrics = rows.drop(columns=[c for c in rows.columns if c in SKIP_COLUMNS - {"company_id"}])
+        metrics = metrics.drop_duplicates("company_id", keep="last").set_index("company_id")
+        metrics = metrics.apply(pd.to_numeric, errors="coerce").astype("float64")
+        frame = frame.join(metrics, how="left")
+    return frame
+
+
+def get_frame(check_interval=CHECK_INTERVAL):
+    """The cached screener frame, reloaded only when a table's fingerprint changes."""
+    with _lock:
+        now = time.time()
+        if _cache["frame"] is not None and now - _cache["checked_at"] < check_interval:
+            return _cache["frame"]
+        fingerprint = supabase.rpc("screener_fingerprint", {}).execute().data
+        if _cache["frame"] is None or fingerprint != _cache["fingerprint"]:
+            _cache["frame"] = load_frame()
+            _cache["fingerprint"] = fingerprint
+        _cache["checked_at"] = now
+        return _cache["frame"]
+
+
+def invalidate():
+    """Force the next get_frame() call to check the tables again."""
+    with _lock:
+        _cache["checked_at"] = 0.0
+
+
+def screen(frame, expression=None, sort_by=None, ascending=True, limit=None):
+    """Filter the frame with a compound expression and sort it, all vectorized.
+
+    expression uses column names directly, e.g.
+    "trailing_pe < 15 & return_on_equity > 0.2 & debt_to_equity < 50".
+    """
+    result = frame
+    if expression and expression.strip():
+        # Only plain column comparisons; no local variables or dunder access
+        if "@" in expression or "__" in expression or re.search(r"\w\s*\(", expression):
+            raise ValueError("Only column names, numbers, strings and comparison operators are allowed.")
+        try:
+            result = frame.query(expression)
+        except Exception as e:
+            raise ValueError(f"Invalid screen expression: {e}") from e
+    if sort_by:
+        result = result.sort_values(sort_by, ascending=ascending, na_position="last")
+    if limit:
+        result = result.head(limit)
+    return result
+
+
+def rank(frame, weights):
+    """Add a composite 0-100 score from percentile ranks, e.g. {"return_on_equity": 1, "trailing_pe": -1}.
+
+    Positive weights favour high values, negative weights favour low values.
+    """
+    columns = list(weights)
+    pct = frame[columns].rank(pct=True)
+    signed = sum(
+        (pct[c] if w > 0 else 1 - pct[c]) * abs(w) for c, w in weights.items()
+    ) / sum(abs(w) for w in weights.values())
+    return frame.assign(score=(signed * 100).round(1)).sort_values("score", ascending=False, na_position="last")
+
+
+def numeric_columns(frame):
+    return [c for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])]
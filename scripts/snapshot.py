@@ -0,0 +1,80 @@
+from dataclasses import dataclass, field
+from supabase_client import supabase
+
+METRIC_TABLES = [
+    "valuation",
+    "profitability",
+    "growth",
+    "balance",
+    "cashflow",
+    "dividends",
+    "recommendations",
+]
+NEWS_FIELDS = "source, title, link, publisher, summary, published, cluster_size"
+RANK_FIELDS = "metric, group_type, group_value, percentile, zscore, peer_count"
+
+
+@dataclass
+class CompanySnapshot:
+    """A company with its metric rows, filings and latest news."""
+    company: dict
+    metrics: dict = field(default_factory=dict)
+    filings: list = field(default_factory=list)
+    news: list = field(default_factory=list)
+    ranks: list = field(default_factory=list)
+
+    @property
+    def company_id(self):
+        return self.company.get("id")
+
+    @property
+    def ticker(self):
+        return self.company.get("ticker")
+
+    def rows(self, table):
+        """Return all rows of a metric table ('companies' returns the company itself)."""
+        if table == "companies":
+            return [self.company]
+        return self.metrics.get(table, [])
+
+    def row(self, table):
+        """Return the first row of a metric table, or None."""
+        rows = self.rows(table)
+        return rows[0] if rows else None
+
+    def rank(self, metric, group_type="industry"):
+        """Return the peer rank row of a metric within the sector or industry, or None."""
+        return next(
+            (r for r in self.ranks if r["metric"] == metric and r["group_type"] == group_type),
+            None,
+        )
+
+
+def load_company_snapshot(ticker=None, company_name=None, news_limit=6):
+    """Load a company and everything related to it in one embedded query."""
+    query = supabase.table("companies").select(
+        ", ".join(["*"] + [f"{t}(*)" for t in METRIC_TABLES] + ["filings(*)", f"news_items({NEWS_FIELDS})", f"peer_ranks({RANK_FIELDS})"])
+    )
+    if ticker:
+        query = query.eq("ticker", ticker.upper())
+    elif company_name:
+        query = query.ilike("company_name", company_name)
+    else:
+        return None
+
+    res = (
+        # Undated items would otherwise sort first and push real headlines off the page
+        query.order("published", desc=True, nullsfirst=False, foreign_table="news_items")
+        .limit(news_limit, foreign_table="news_items")
+        .limit(1)
+        .execute()
+    )
+    if not res.data:
+        return None
+
+    company = dict(res.data[0])
+    metrics = {t: company.pop(t, None) or [] for t in METRIC_TABLES}
+    filings = company.pop("filings", None) or []
+    news = company.pop("news_items", None) or []
+    ranks = company.pop("peer_ranks", None) or []
+    return CompanySnapshot(company=company, metrics=metrics, filings=filings, news=news, ranks=ranks)
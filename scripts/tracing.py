@@ -0,0 +1,198 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# In-memory ring buffers: the most recent spans and Streamlit reruns
+MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", 20000))
+MAX_RERUNS = 200
+
+_spans = deque(maxlen=MAX_SPANS)
+_reruns = deque(maxlen=MAX_RERUNS)
+_lock = threading.Lock()
+_current_rerun = contextvars.ContextVar("current_rerun", default=None)
+
+
+def host(url):
+    return urlparse(str(url)).netloc
+
+
+@contextmanager
+def span(op, **tags):
+    """Time a block as one span of operation op (e.g. "supabase.select"), tagged with tags.
+
+    The yielded dict can be used to add tags once they are known.
+    """
+    started = time.time()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield tags
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        rerun = _current_rerun.get()
+        record = {
+            "op": op,
+            "start": started,
+            "ms": round(ms, 3),
+            "tags": {k: v for k, v in tags.items() if v is not None},
+            "error": error,
+            "rerun": rerun["id"] if rerun else None,
+            "thread": threading.current_thread().name,
+        }
+        with _lock:
+            _spans.append(record)
+            if rerun:
+                rerun["calls"][op] += 1
+                rerun["call_ms"] += ms
+                rerun["last_activity"] = max(rerun["last_activity"], started + ms / 1000)
+
+
+def bind(fn):
+    """Run fn in the caller's context so spans from pool threads count toward its rerun."""
+    context = contextvars.copy_context()
+    # A context can only be entered by one thread at a time, so each call runs in a copy
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+# -------- Streamlit reruns --------
+def begin_rerun(page):
+    """Start attributing spans in this script run to a new rerun of page."""
+    now = time.time()
+    rerun = {
+        "id": uuid.uuid4().hex[:12],
+        "page": page,
+        "started": now,
+        "ended": None,
+        "last_activity": now,
+        "calls": Counter(),
+        "call_ms": 0.0,
+    }
+    with _lock:
+        _reruns.append(rerun)
+    _current_rerun.set(rerun)
+    return rerun["id"]
+
+
+def end_rerun():
+    """Mark the current rerun as finished (reruns cut short by st.stop() fall back to their last span)."""
+    rerun = _current_rerun.get()
+    if rerun:
+        rerun["ended"] = time.time()
+
+
+def _rerun_row(rerun):
+    ended = rerun["ended"] or rerun["last_activity"]
+    return {
+        "id": rerun["id"],
+        "page": rerun["page"],
+        "started": rerun["started"],
+        "seconds": round(ended - rerun["started"], 3),
+        "calls": sum(rerun["calls"].values()),
+        "call_seconds": round(rerun["call_ms"] / 1000, 3),
+        "by_op": dict(rerun["calls"]),
+    }
+
+
+def slowest_reruns(limit=10, page=None):
+    with _lock:
+        rows = [_rerun_row(r) for r in _reruns if page is None or r["page"] == page]
+    return sorted(rows, key=lambda r: r["seconds"], reverse=True)[:limit]
+
+
+# -------- Reporting --------
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def spans(op=None, since=None):
+    with _lock:
+        return [
+            s for s in _spans
+            if (op is None or s["op"] == op) and (since is None or s["start"] >= since)
+        ]
+
+
+def latency_summary(since=None, by_tag=None):
+    """p50/p95/max latency per operation (and per by_tag value, e.g. "table" or "host")."""
+    groups = {}
+    for s in spans(since=since):
+        key = (s["op"], s["tags"].get(by_tag)) if by_tag else (s["op"], None)
+        groups.setdefault(key, []).append(s)
+
+    rows = []
+    for (op, tag), items in groups.items():
+        durations = sorted(s["ms"] for s in items)
+        row = {"op": op}
+        if by_tag:
+            row[by_tag] = tag
+        row.update({
+            "calls": len(items),
+            "errors": sum(1 for s in items if s["error"]),
+            "p50_ms": _percentile(durations, 50),
+            "p95_ms": _percentile(durations, 95),
+            "max_ms": durations[-1],
+            "total_s": round(sum(durations) / 1000, 3),
+        })
+        rows.append(row)
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+def export_jsonl(path=None, since=None):
+    """Spans as JSON lines; written to path when given, otherwise returned as a string."""
+    text = "".join(json.dumps(s, default=str) + "\n" for s in spans(since=since))
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+
+def clear():
+    with _lock:
+        _spans.clear()
+        _reruns.clear()
+
+
+# -------- Supabase --------
+_supabase_instrumented = False
+_VERBS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def instrument_supabase():
+    """Wrap every postgrest execute() in a span tagged with table and method."""
+    global _supabase_instrumented
+    if _supabase_instrumented:
+        return
+    from postgrest._sync import request_builder
+
+    def wrap(execute):
+        def traced_execute(self):
+            request = getattr(self, "request", None)
+            path = str(getattr(request, "path", ""))
+            resource = path.split("/rest/v1/", 1)[-1].strip("/")
+            verb = _VERBS.get(getattr(request, "http_method", ""), "request")
+            if verb == "insert" and "resolution=" in str(getattr(request, "headers", {}).get("prefer", "")):
+                verb = "upsert"
+            if resource.startswith("rpc/"):
+                op, tags = "supabase.rpc", {"table": resource[4:]}
+            else:
+                op, tags = f"supabase.{verb}", {"table": resource}
+            with span(op, **tags):
+                return execute(self)
+        return traced_execute
+
+    for name in dir(request_builder):
+        cls = getattr(request_builder, name)
+        if isinstance(cls, type) and "execute" in cls.__dict__:
+            cls.execute = wrap(cls.__dict__["execute"])
+    _supabase_instrumented = True
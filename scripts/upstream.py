@@ -0,0 +1,271 @@
+import os
+import random
+import threading
+import time
+
+# yfinance spreads calls over several Yahoo hosts that share one quota
+YFINANCE_HOST = "yfinance"
+
+# Requests per second and burst allowed per upstream host; "*" covers the rest.
+# Override with UPSTREAM_RATES="yfinance=2:4,news.google.com=1:2".
+RATES = {
+    YFINANCE_HOST: (4.0, 8),
+    "news.google.com": (2.0, 4),
+    "*": (4.0, 8),
+}
+for _override in filter(None, os.environ.get("UPSTREAM_RATES", "").split(",")):
+    _name, _limit = _override.split("=")
+    _rate, _, _burst = _limit.partition(":")
+    RATES[_name.strip()] = (float(_rate), int(_burst or max(1, float(_rate))))
+
+# Attempts after the first for throttled and transient failures
+MAX_RETRIES = 3
+# Backoff before retry n is drawn from [BASE_DELAY, BASE_DELAY * 2**n], capped
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+# A throttled host drops to this fraction of its rate, and never below MIN_RATE_FRACTION
+BACKOFF_FACTOR = 0.5
+MIN_RATE_FRACTION = 1 / 16
+# Each success gives back this fraction of the configured rate
+RECOVERY_FRACTION = 0.05
+# Consecutive failures that open a host's circuit, and seconds it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+
+COUNTERS = ("calls", "waited", "throttled", "retried", "failed", "rejected")
+
+_hosts = {}
+_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """An upstream call failed permanently (not worth retrying)."""
+
+
+class TransientError(UpstreamError):
+    """An upstream call failed in a way a retry may fix (5xx, timeout, reset)."""
+
+
+class ThrottledError(TransientError):
+    """The upstream host asked us to slow down (429 or equivalent)."""
+
+
+class EmptyResponseError(UpstreamError):
+    """The upstream answered without data, e.g. yfinance info for an unknown ticker."""
+
+
+class CircuitOpenError(UpstreamError):
+    """The host failed repeatedly and is not being called until its cooldown ends."""
+
+
+class TokenBucket:
+    """Token bucket whose rate halves on throttling and creeps back on success."""
+
+    def __init__(self, rate, burst):
+        self.max_rate = self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take a token, sleeping until one is available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate * BACKOFF_FACTOR)
+            # Drain the burst so the slower rate applies immediately
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+
+class CircuitBreaker:
+    """Closed until BREAKER_THRESHOLD consecutive failures, then open for the cooldown.
+
+    After the cooldown one trial call is let through (half-open); its outcome
+    closes or reopens the circuit.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.trial or time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True
+            return True
+
+    def succeeded(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self.trial = False
+
+
+class _Host:
+    def __init__(self, name):
+        rate, burst = RATES.get(name, RATES["*"])
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker()
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def count(self, counter):
+        with self._lock:
+            self.counts[counter] += 1
+
+
+def _host(name):
+    with _lock:
+        if name not in _hosts:
+            _hosts[name] = _Host(name)
+        return _hosts[name]
+
+
+def _status(exc):
+    for holder in (exc, getattr(exc, "response", None)):
+        status = getattr(holder, "status_code", None) or getattr(holder, "status", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def classify(exc):
+    """Return "throttled", "transient" or "permanent" for an exception from an upstream call."""
+    if isinstance(exc, ThrottledError):
+        return "throttled"
+    if isinstance(exc, TransientError):
+        return "transient"
+    if isinstance(exc, UpstreamError):
+        return "permanent"
+    status = _status(exc)
+    if status == 429 or "RateLimit" in type(exc).__name__ or "Too Many Requests" in str(exc):
+        return "throttled"
+    if status is not None:
+        return "transient" if status >= 500 else "permanent"
+    # Connection resets and timeouts from httpx, requests and the stdlib
+    name = type(exc).__name__
+    if isinstance(exc, (ConnectionError, TimeoutError)) or any(
+        word in name for word in ("Timeout", "Connect", "Network", "Transport", "Protocol")
+    ):
+        return "transient"
+    return "permanent"
+
+
+def check_status(status_code):
+    """Raise the matching error for a throttled or server-error HTTP status."""
+    if status_code == 429:
+        raise ThrottledError(f"HTTP {status_code}")
+    if status_code >= 500:
+        raise TransientError(f"HTTP {status_code}")
+
+
+def backoff(attempt):
+    """Jittered exponential delay before retry number attempt (0-based)."""
+    return random.uniform(BASE_DELAY, min(MAX_DELAY, BASE_DELAY * 2 ** (attempt + 1)))
+
+
+def call(host, fn, *args, retries=MAX_RETRIES, validate=None, **kwargs):
+    """Call fn(*args, **kwargs) against host through its rate limiter and circuit breaker.
+
+    Throttled and transient failures are retried with jittered exponential
+    backoff; a throttled host also has its rate halved. Permanent failures are
+    raised at once. When validate is given and returns False for the result,
+    EmptyResponseError is raised instead of returning it.
+
+    Failures of the upstream surface as UpstreamError subclasses (chained to
+    the original exception); anything else, such as a bug in fn, propagates
+    unchanged.
+    """
+    state = _host(host)
+    for attempt in range(retries + 1):
+        if not state.breaker.allow():
+            state.count("rejected")
+            raise CircuitOpenError(f"{host} is failing; retrying after {state.breaker.cooldown:.0f}s")
+        if state.bucket.acquire() > 0:
+            state.count("waited")
+        state.count("calls")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            kind = classify(e)
+            if kind == "permanent":
+                # The host answered; the request itself was bad
+                state.breaker.succeeded()
+                state.count("failed")
+                if isinstance(e, UpstreamError) or _status(e) is None:
+                    raise
+                raise UpstreamError(f"{host}: {e}") from e
+            if kind == "throttled":
+                state.count("throttled")
+                state.bucket.throttled()
+            state.breaker.failed()
+            if attempt == retries:
+                state.count("failed")
+                if isinstance(e, UpstreamError):
+                    raise
+                error = ThrottledError if kind == "throttled" else TransientError
+                raise error(f"{host} failed after {retries + 1} attempts: {e}") from e
+            state.count("retried")
+            time.sleep(backoff(attempt))
+            continue
+
+        state.bucket.succeeded()
+        state.breaker.succeeded()
+        if validate is not None and not validate(result):
+            state.count("failed")
+            raise EmptyResponseError(f"{host} returned no data")
+        return result
+
+
+def stats():
+    """Return {host: counters, current rate and circuit state} for this process."""
+    with _lock:
+        hosts = dict(_hosts)
+    return {
+        name: {**state.counts, "rate": round(state.bucket.rate, 2), "circuit": state.breaker.state}
+        for name, state in sorted(hosts.items())
+    }
+
+
+def reset():
+    with _lock:
+        _hosts.clear()
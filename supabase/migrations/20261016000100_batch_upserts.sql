@@ -0,0 +1,25 @@
+-- Conflict targets for the batched upserts in scripts/db_writer.py
+create unique index if not exists companies_ticker_key on companies (ticker);
+create unique index if not exists valuation_uniquekey_key on valuation (uniquekey);
+create unique index if not exists profitability_uniquekey_key on profitability (uniquekey);
+create unique index if not exists growth_uniquekey_key on growth (uniquekey);
+create unique index if not exists balance_uniquekey_key on balance (uniquekey);
+create unique index if not exists cashflow_uniquekey_key on cashflow (uniquekey);
+create unique index if not exists dividends_uniquekey_key on dividends (uniquekey);
+create unique index if not exists recommendations_uniquekey_key on recommendations (uniquekey);
+create unique index if not exists filings_ticker_key on filings (ticker);
+
+-- created_at is set by the database on insert and never sent by the client,
+-- so an upsert only touches it for new rows
+alter table companies alter column created_at set default now();
+alter table valuation alter column created_at set default now();
+alter table profitability alter column created_at set default now();
+alter table growth alter column created_at set default now();
+alter table balance alter column created_at set default now();
+alter table cashflow alter column created_at set default now();
+alter table dividends alter column created_at set default now();
+alter table recommendations alter column created_at set default now();
+
+-- filings is written through the same upsert layer
+alter table filings add column if not exists created_at timestamptz default now();
+alter table filings add column if not exists updated_at timestamptz;
@@ -0,0 +1,19 @@
+-- One row per article, deduplicated per ticker by a hash of its normalized link/title
+create table if not exists news_items (
+    id bigint generated by default as identity primary key,
+    ticker text not null,
+    company_name text,
+    article_hash text not null,
+    source text,
+    title text,
+    link text,
+    publisher text,
+    summary text,
+    published timestamptz,
+    first_seen timestamptz not null default now(),
+    unique (ticker, article_hash)
+);
+
+-- Paging a ticker's news newest first
+create index if not exists news_items_ticker_published
+    on news_items (ticker, published desc);
@@ -0,0 +1,60 @@
+-- Lease columns so exactly one worker processes each due filing
+alter table filings add column if not exists lease_owner text;
+alter table filings add column if not exists lease_expires_at timestamptz;
+alter table filings add column if not exists attempts integer not null default 0;
+alter table filings add column if not exists last_error text;
+
+create index if not exists filings_next_earnings_date on filings (next_earnings_date);
+
+-- Last run per worker process
+create table if not exists worker_runs (
+    worker_id text not null,
+    job text not null,
+    last_run_at timestamptz,
+    last_processed integer not null default 0,
+    last_failed integer not null default 0,
+    primary key (worker_id, job)
+);
+
+-- Atomically lease up to p_limit due filings that no live worker holds;
+-- filings that keep failing are left for an admin after p_max_attempts
+create or replace function claim_due_filings(
+    p_worker text,
+    p_limit integer,
+    p_lease_seconds integer,
+    p_max_attempts integer default 5
+)
+returns setof filings
+language sql
+as $$
+    update filings f
+       set lease_owner = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+     where f.ticker in (
+           select ticker
+             from filings
+            where next_earnings_date <= now()
+              and (lease_expires_at is null or lease_expires_at < now())
+              and attempts < p_max_attempts
+            order by next_earnings_date
+            limit p_limit
+            for update skip locked)
+    returning f.*;
+$$;
+
+-- Queue depth, in-flight count and last run for the dashboard, in one call
+create or replace function filing_queue_status()
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'queue_depth', (select count(*) from filings
+                         where next_earnings_date <= now()
+                           and (lease_expires_at is null or lease_expires_at < now())
+                           and attempts < 5),
+        'failed', (select count(*) from filings where attempts >= 5),
+        'in_flight', (select count(*) from filings where lease_expires_at >= now()),
+        'last_run_at', (select max(last_run_at) from worker_runs where job = 'filings')
+    );
+$$;
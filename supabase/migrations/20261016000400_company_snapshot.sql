@@ -0,0 +1,26 @@
+-- Computed relationships so filings and news_items (keyed by ticker, not by a
+-- foreign key) can be embedded in a companies query: companies?select=*,filings(*),news_items(*)
+create or replace function filings(companies)
+returns setof filings
+language sql
+stable
+as $$
+    select * from filings where ticker = $1.ticker;
+$$;
+
+create or replace function news_items(companies)
+returns setof news_items
+language sql
+stable
+as $$
+    select * from news_items where ticker = $1.ticker;
+$$;
+
+-- Metric tables embed through their company_id foreign key
+create index if not exists valuation_company_id on valuation (company_id);
+create index if not exists profitability_company_id on profitability (company_id);
+create index if not exists growth_company_id on growth (company_id);
+create index if not exists balance_company_id on balance (company_id);
+create index if not exists cashflow_company_id on cashflow (company_id);
+create index if not exists dividends_company_id on dividends (company_id);
+create index if not exists recommendations_company_id on recommendations (company_id);
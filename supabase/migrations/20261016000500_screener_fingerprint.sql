@@ -0,0 +1,16 @@
+-- Cheap change detector for the screener cache: last write time and row count per table
+create or replace function screener_fingerprint()
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'companies', (select json_build_array(max(updated_at), count(*)) from companies),
+        'valuation', (select json_build_array(max(updated_at), count(*)) from valuation),
+        'profitability', (select json_build_array(max(updated_at), count(*)) from profitability),
+        'growth', (select json_build_array(max(updated_at), count(*)) from growth),
+        'balance', (select json_build_array(max(updated_at), count(*)) from balance),
+        'cashflow', (select json_build_array(max(updated_at), count(*)) from cashflow),
+        'dividends', (select json_build_array(max(updated_at), count(*)) from dividends)
+    );
+$$;
@@ -0,0 +1,18 @@
+-- Precomputed percentile and z-score of every metric within its sector and industry
+create table if not exists peer_ranks (
+    id bigint generated by default as identity primary key,
+    company_id bigint not null references companies (id) on delete cascade,
+    metric text not null,
+    group_type text not null check (group_type in ('sector', 'industry')),
+    group_value text not null,
+    value double precision,
+    percentile double precision,
+    zscore double precision,
+    peer_count integer not null,
+    uniquekey text not null unique,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz
+);
+
+create index if not exists peer_ranks_company_id on peer_ranks (company_id);
+create index if not exists peer_ranks_group on peer_ranks (group_type, group_value, metric);
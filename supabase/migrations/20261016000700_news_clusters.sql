@@ -0,0 +1,2 @@
+-- Number of near-duplicate articles (syndicated copies) each stored article stands for
+alter table news_items add column if not exists cluster_size integer not null default 1;
@@ -0,0 +1,9 @@
+-- When each kind of data (fundamentals groups, news, filings) was last refreshed per ticker
+create table if not exists refresh_state (
+    ticker text not null,
+    kind text not null,
+    refreshed_at timestamptz,
+    attempted_at timestamptz,
+    error text,
+    primary key (ticker, kind)
+);
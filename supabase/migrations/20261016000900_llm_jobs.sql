@@ -0,0 +1,57 @@
+-- Analyses are memoized by a hash of (model, ticker, metric data)
+alter table llm_analysis add column if not exists model text;
+alter table llm_analysis add column if not exists input_hash text;
+
+create index if not exists llm_analysis_input_hash on llm_analysis (input_hash);
+
+-- Analyses waiting for, or being run by, a background worker
+create table if not exists llm_jobs (
+    id bigint generated always as identity primary key,
+    ticker text not null,
+    model text not null,
+    status text not null default 'queued',
+    input_hash text,
+    result text,
+    error text,
+    attempts integer not null default 0,
+    lease_owner text,
+    lease_expires_at timestamptz,
+    created_at timestamptz not null default now(),
+    finished_at timestamptz
+);
+
+create index if not exists llm_jobs_status on llm_jobs (status, created_at);
+-- One live job per ticker and model; repeated submissions share it
+create unique index if not exists llm_jobs_active
+    on llm_jobs (ticker, model) where status in ('queued', 'running');
+
+-- Atomically lease up to p_limit queued jobs (or running ones whose worker
+-- died), oldest first; jobs whose workers keep dying fail after p_max_attempts
+create or replace function claim_llm_jobs(
+    p_worker text,
+    p_limit integer,
+    p_lease_seconds integer,
+    p_max_attempts integer default 3
+)
+returns setof llm_jobs
+language sql
+as $$
+    update llm_jobs
+       set status = 'failed', error = coalesce(error, 'worker lost'), finished_at = now()
+     where status = 'running' and lease_expires_at < now() and attempts >= p_max_attempts;
+
+    update llm_jobs j
+       set status = 'running',
+           lease_owner = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           attempts = j.attempts + 1
+     where j.id in (
+           select id
+             from llm_jobs
+            where (status = 'queued' or (status = 'running' and lease_expires_at < now()))
+              and attempts < p_max_attempts
+            order by created_at
+            limit p_limit
+            for update skip locked)
+    returning j.*;
+$$;
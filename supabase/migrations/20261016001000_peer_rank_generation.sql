@@ -0,0 +1,5 @@
+-- Each recomputation stamps its rows; rows of the same groups from older
+-- recomputations (companies that left a group, metrics that became null) are deleted
+alter table peer_ranks add column if not exists generation bigint not null default 0;
+
+create index if not exists peer_ranks_generation on peer_ranks (group_type, group_value, generation);
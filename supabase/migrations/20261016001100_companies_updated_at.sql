@@ -0,0 +1,18 @@
+-- companies.updated_at is stamped by the database, not the writing client, so
+-- the company index's incremental refresh never misses a row to clock skew
+create or replace function set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists companies_set_updated_at on companies;
+create trigger companies_set_updated_at
+    before insert or update on companies
+    for each row execute function set_updated_at();
+
+create index if not exists companies_updated_at on companies (updated_at);
@@ -0,0 +1,22 @@
+-- The attempt limit comes from the caller (filings.MAX_ATTEMPTS), as it does
+-- for claim_due_filings, so the dashboard counts failures by the same limit
+drop function if exists filing_queue_status();
+
+create or replace function filing_queue_status(p_max_attempts integer default 5)
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'queue_depth', (select count(*) from filings
+                         where next_earnings_date <= now()
+                           and (lease_expires_at is null or lease_expires_at < now())
+                           and attempts < p_max_attempts),
+        'failed', (select count(*) from filings where attempts >= p_max_attempts),
+        'in_flight', (select count(*) from filings where lease_expires_at >= now()),
+        'last_run_at', (select max(last_run_at) from worker_runs where job = 'filings')
+    );
+$$;
+
+-- Why a worker's last round failed as a whole, shown on the dashboard
+alter table worker_runs add column if not exists last_error text;
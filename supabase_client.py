@@ -1,9 +1,31 @@
-import streamlit as st
-from supabase import create_client, Client
+import threading
+from scripts.config import require
+from scripts.tracing import instrument_supabase
 
-# Read from Streamlit secrets instead of .env
-SUPABASE_URL = st.secrets["NEXT_PUBLIC_SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["NEXT_PUBLIC_SUPABASE_ANON_KEY"]
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+class LazyClient:
+    """Supabase client that is created on first use, so importing a page stays cheap."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+
+                    # Environment, the APP_CONFIG file or Streamlit secrets
+                    url = require("NEXT_PUBLIC_SUPABASE_URL")
+                    key = require("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+                    # Every query is timed by the tracing layer
+                    instrument_supabase()
+                    self._client = create_client(url, key)
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+supabase = LazyClient()